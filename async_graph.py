@@ -0,0 +1,62 @@
+# Course: CS261 - Data Structures
+# Author: Alexandra Fren
+# Description: Runs the lazy traversals of the graph classes (iter_bfs, iter_dfs, iter_dijkstra) from asyncio code
+# without blocking the event loop. By default the traversal runs on the loop itself and hands control back every
+# `every` items; with offload=True it runs on an executor thread while the loop waits. Either way a timeout or a set
+# cancel event stops it within a few items and the items found so far are returned. Cancelling the awaiting task
+# stops it the same way, but raises CancelledError as asyncio expects
+
+import asyncio
+import threading
+
+# items taken from the traversal between two hand-backs to the event loop
+YIELD_EVERY = 1024
+
+
+async def collect(items, timeout=None, cancel=None, offload=False, executor=None, every=YIELD_EVERY) -> []:
+    """
+    Return list of the items of an iterator, or of those found before the traversal was stopped
+    - timeout is in seconds, cancel an asyncio.Event or threading.Event that stops the traversal once set
+    - offload=True runs the iterator on executor (the loop's default executor if None) instead of the loop;
+      the graph must not be edited meanwhile, a snapshot() can be traversed instead
+    """
+    if offload:
+        return await _collect_offloaded(items, timeout, cancel, executor)
+    loop = asyncio.get_running_loop()
+    deadline = None if timeout is None else loop.time() + timeout
+    found = []
+    count = 0
+    for item in items:
+        found.append(item)
+        count += 1
+        if count == every:
+            count = 0
+            await asyncio.sleep(0)
+            if (deadline is not None and loop.time() >= deadline) or (cancel is not None and cancel.is_set()):
+                break
+    return found
+
+
+async def _collect_offloaded(items, timeout, cancel, executor) -> []:
+    """
+    Collect items on an executor thread that checks a stop flag after every item
+    """
+    found = []
+    stop = threading.Event()
+
+    def run():
+        for item in items:
+            found.append(item)
+            if stop.is_set() or (cancel is not None and cancel.is_set()):
+                break
+
+    future = asyncio.get_running_loop().run_in_executor(executor, run)
+    try:
+        await asyncio.wait_for(asyncio.shield(future), timeout)
+    except asyncio.TimeoutError:
+        stop.set()
+        await future
+    except asyncio.CancelledError:
+        stop.set()
+        raise
+    return found
@@ -0,0 +1,264 @@
+# Course: CS261 - Data Structures
+# Author: Alexandra Fren
+# Description: Benchmarks for the graph classes on seeded synthetic graphs (Erdos-Renyi, Barabasi-Albert, grids,
+# DAGs and road-network-like grids) from 10^3 to 10^6 vertices. Times construction, dfs, bfs, has_cycle, dijkstra,
+# get_edges and count_connected_components, reports seconds, edges per second and peak traced memory as JSON, and
+# can compare a run against a stored baseline to flag slowdowns.
+#
+#   python benchmark.py --sizes 1000,10000 --output run.json
+#   python benchmark.py --sizes 1000,10000 --compare run.json
+
+import argparse
+import json
+import math
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from d_graph import DirectedGraph, SparseDirectedGraph
+from ud_graph import UndirectedGraph
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+# the adjacency matrix of DirectedGraph takes V^2 entries, larger graphs are only run on the sparse classes
+DENSE_LIMIT = 2000
+# a result slower than its baseline by more than this factor is reported as a regression
+THRESHOLD = 1.25
+# results faster than this are too noisy to flag
+MIN_SECONDS = 0.001
+MAX_WEIGHT = 100
+
+
+def erdos_renyi(n: int, seed: int, degree=4) -> []:
+    """
+    Return list of about n * degree random (u, v, weight) edges on vertices 0 .. n - 1, G(n, m) style
+    """
+    r = random.Random(seed)
+    edges = []
+    for _ in range(n * degree):
+        u, v = r.randrange(n), r.randrange(n)
+        if u != v:
+            edges.append((u, v, r.randint(1, MAX_WEIGHT)))
+    return edges
+
+
+def barabasi_albert(n: int, seed: int, degree=3) -> []:
+    """
+    Return list of preferential attachment edges: each new vertex links to degree earlier ones picked by degree
+    """
+    r = random.Random(seed)
+    edges = []
+    # every vertex appears here once per edge end, so a uniform pick is a pick by degree
+    ends = list(range(degree))
+    for v in range(degree, n):
+        picked = set()
+        while len(picked) < degree:
+            picked.add(r.choice(ends))
+        for u in picked:
+            edges.append((v, u, r.randint(1, MAX_WEIGHT)))
+            ends.append(u)
+            ends.append(v)
+    return edges
+
+
+def grid(n: int, seed: int) -> []:
+    """
+    Return list of edges of a square grid with about n vertices, every vertex linked to its right and lower neighbor
+    """
+    r = random.Random(seed)
+    side = max(1, math.isqrt(n))
+    edges = []
+    for v in range(side * side):
+        if v % side < side - 1:
+            edges.append((v, v + 1, r.randint(1, MAX_WEIGHT)))
+        if v + side < side * side:
+            edges.append((v, v + side, r.randint(1, MAX_WEIGHT)))
+    return edges
+
+
+def dag(n: int, seed: int, degree=4, window=100) -> []:
+    """
+    Return list of edges of a random DAG: every vertex links to degree vertices at most window ids after it
+    """
+    r = random.Random(seed)
+    edges = []
+    for u in range(n - 1):
+        for _ in range(degree):
+            edges.append((u, min(n - 1, u + r.randint(1, window)), r.randint(1, MAX_WEIGHT)))
+    return edges
+
+
+def road(n: int, seed: int, missing=0.1, highways=0.001) -> []:
+    """
+    Return list of edges of a road-network-like graph: a two-way grid with a fraction of the streets missing,
+    weights by street length, and a few long and fast highway links
+    """
+    r = random.Random(seed)
+    side = max(1, math.isqrt(n))
+    size = side * side
+    edges = []
+    for v in range(size):
+        for w in ((v + 1) if v % side < side - 1 else None, (v + side) if v + side < size else None):
+            if w is not None and r.random() >= missing:
+                length = r.randint(10, MAX_WEIGHT)
+                edges.append((v, w, length))
+                edges.append((w, v, length))
+    for _ in range(int(size * highways)):
+        u, v = r.randrange(size), r.randrange(size)
+        if u != v:
+            edges.append((u, v, MAX_WEIGHT))
+            edges.append((v, u, MAX_WEIGHT))
+    return edges
+
+
+GENERATORS = {'erdos_renyi': erdos_renyi, 'barabasi_albert': barabasi_albert, 'grid': grid, 'dag': dag,
+              'road': road}
+
+
+def _directed_ops(graph) -> dict:
+    """
+    Return {name: function} of the operations timed on a directed graph
+    """
+    return {'dfs': lambda: graph.dfs(0), 'bfs': lambda: graph.bfs(0), 'has_cycle': graph.has_cycle,
+            'dijkstra': lambda: graph.dijkstra(0), 'get_edges': graph.get_edges}
+
+
+def _undirected_ops(graph) -> dict:
+    """
+    Return {name: function} of the operations timed on an undirected graph
+    """
+    start = next(iter(graph.adj_list), None)
+    return {'dfs': lambda: graph.dfs(start), 'bfs': lambda: graph.bfs(start), 'has_cycle': graph.has_cycle,
+            'get_edges': graph.get_edges, 'count_connected_components': graph.count_connected_components}
+
+
+def _forget(graph) -> None:
+    """
+    Drop results the graph keeps between queries, so every repeat times the full computation
+    """
+    if isinstance(graph, DirectedGraph):
+        graph._derived = None
+    else:
+        graph._components = None
+    graph._cache = None
+
+
+def _measure(run, repeat: int, memory: bool, setup=None) -> (float, int):
+    """
+    Return (best seconds of repeat runs, peak traced bytes of one more run or None)
+    """
+    best = math.inf
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    peak = None
+    if memory:
+        if setup is not None:
+            setup()
+        tracemalloc.start()
+        try:
+            run()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return best, peak
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, generators=None, seed=0, repeat=3, memory=True, log=None) -> dict:
+    """
+    Return benchmark report {'meta': {...}, 'results': [...]}, one result per generator, size, graph class and
+    operation with its seconds, edges per second and peak traced bytes
+    - generators is a list of GENERATORS names, all by default
+    - log(result) is called for every result as soon as it is measured
+    """
+    results = []
+    for name in generators or GENERATORS:
+        for n in sizes:
+            edges = GENERATORS[name](n, seed)
+            named = [(str(u), str(v)) for u, v, _ in edges]
+            builds = [('SparseDirectedGraph', lambda: SparseDirectedGraph.from_edges(edges, n), _directed_ops),
+                      ('UndirectedGraph', lambda: UndirectedGraph.from_edges(named), _undirected_ops)]
+            if n <= DENSE_LIMIT:
+                builds.insert(0, ('DirectedGraph', lambda: DirectedGraph.from_edges(edges, n), _directed_ops))
+            for cls_name, build, ops in builds:
+                graph = build()
+                timings = [('construct', build, None)]
+                timings.extend((op, run, lambda: _forget(graph)) for op, run in ops(graph).items())
+                for op, run, setup in timings:
+                    seconds, peak = _measure(run, repeat, memory, setup)
+                    result = {'generator': name, 'n': n, 'm': len(edges), 'graph': cls_name, 'op': op,
+                              'seconds': seconds, 'edges_per_second': len(edges) / seconds if seconds else None,
+                              'peak_bytes': peak}
+                    results.append(result)
+                    if log is not None:
+                        log(result)
+    meta = {'python': platform.python_version(), 'platform': platform.platform(), 'seed': seed, 'repeat': repeat}
+    return {'meta': meta, 'results': results}
+
+
+def compare(report: dict, baseline: dict, threshold=THRESHOLD) -> []:
+    """
+    Return list of regressions, results slower than the matching baseline result by more than threshold
+    Each is the result with 'baseline_seconds' and 'ratio' added; results missing from either side are skipped
+    """
+    def key(result):
+        return result['generator'], result['n'], result['graph'], result['op']
+
+    before = {key(result): result for result in baseline['results']}
+    regressions = []
+    for result in report['results']:
+        old = before.get(key(result))
+        if old is None or result['seconds'] < MIN_SECONDS:
+            continue
+        ratio = result['seconds'] / old['seconds'] if old['seconds'] else math.inf
+        if ratio > threshold:
+            regressions.append(dict(result, baseline_seconds=old['seconds'], ratio=ratio))
+    return regressions
+
+
+def main(argv=None) -> int:
+    """
+    Run the benchmarks from the command line, return 1 if a baseline comparison found regressions, 0 otherwise
+    """
+    parser = argparse.ArgumentParser(description='Benchmark the graph classes on seeded synthetic graphs')
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help='comma separated vertex counts, 10^3 to 10^6')
+    parser.add_argument('--generators', default=','.join(GENERATORS),
+                        help='comma separated generators out of ' + ', '.join(GENERATORS))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help='report the best of this many runs')
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc peak memory run')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    parser.add_argument('--compare', metavar='BASELINE', help='flag results slower than this stored report')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help='slowdown factor that counts as regression')
+    args = parser.parse_args(argv)
+
+    def log(result):
+        print(f"{result['generator']:>16} {result['n']:>8} {result['graph']:>20} {result['op']:>26} "
+              f"{result['seconds']:10.4f}s", file=sys.stderr)
+
+    report = run_benchmarks([int(n) for n in args.sizes.split(',')], args.generators.split(','), args.seed,
+                            args.repeat, not args.no_memory, log)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for result in regressions:
+            print(f"REGRESSION {result['generator']} n={result['n']} {result['graph']}.{result['op']}: "
+                  f"{result['baseline_seconds']:.4f}s -> {result['seconds']:.4f}s ({result['ratio']:.2f}x)",
+                  file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
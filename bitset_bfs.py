@@ -0,0 +1,97 @@
+# Course: CS261 - Data Structures
+# Author: Alexandra Fren
+# Description: Breadth first search from many sources at once. Up to 64 sources share one level-synchronous search:
+# every vertex keeps a bit mask of the sources that have reached it, so one edge scan advances all of them. Levels
+# can be expanded top-down (frontier pushes to neighbors) or bottom-up (unfinished vertices look for a frontier
+# neighbor), and the 'auto' mode switches between the two by frontier size as in direction-optimizing BFS
+
+# sources handled per search, one bit each
+WORD = 64
+# auto mode goes bottom-up once the frontier holds more than 1/ALPHA of the vertices,
+# and back to top-down once it holds fewer than 1/BETA of them
+ALPHA = 20
+BETA = 24
+
+
+def multi_bfs(sources: [], vertices: [], out_edges, in_edges, size: int, distances=False, direction='auto') -> []:
+    """
+    Return one result per source, in source order: the set of vertices it reaches, or with distances=True
+    a {vertex: hop count} dict
+    - vertices are ints below size, vertices lists all of them, sources must be among them
+    - out_edges(v) / in_edges(v) return the vertices v has an edge to / from (the same for undirected graphs)
+    - direction is 'top-down', 'bottom-up' or 'auto'
+    """
+    if direction not in ('auto', 'top-down', 'bottom-up'):
+        raise ValueError(f'unknown direction {direction!r}')
+    results = []
+    for start in range(0, len(sources), WORD):
+        batch = sources[start:start + WORD]
+        results.extend(_search(batch, vertices, out_edges, in_edges, size, distances, direction))
+    return results
+
+
+def _search(batch: [], vertices: [], out_edges, in_edges, size: int, distances: bool, direction: str) -> []:
+    """
+    Run one bit-parallel search for at most WORD sources
+    """
+    full = (1 << len(batch)) - 1
+    seen = [0] * size
+    reached = [dict() if distances else set() for _ in batch]
+    frontier = dict()
+    for k, s in enumerate(batch):
+        seen[s] |= 1 << k
+        frontier[s] = frontier.get(s, 0) | 1 << k
+        if distances:
+            reached[k][s] = 0
+    bottom_up = direction == 'bottom-up'
+    level = 0
+    while frontier:
+        level += 1
+        nxt = dict()
+        if bottom_up:
+            for w in vertices:
+                missing = full & ~seen[w]
+                if not missing:
+                    continue
+                new = 0
+                for v in in_edges(w):
+                    bits = frontier.get(v)
+                    if bits:
+                        new |= bits & missing
+                        if new == missing:
+                            break
+                if new:
+                    seen[w] |= new
+                    nxt[w] = new
+        else:
+            for v, bits in frontier.items():
+                for w in out_edges(v):
+                    new = bits & ~seen[w]
+                    if new:
+                        seen[w] |= new
+                        nxt[w] = nxt.get(w, 0) | new
+        if distances:
+            for w, new in nxt.items():
+                for k in _bits(new):
+                    reached[k][w] = level
+        frontier = nxt
+        if direction == 'auto':
+            if not bottom_up and len(frontier) * ALPHA > len(vertices):
+                bottom_up = True
+            elif bottom_up and len(frontier) * BETA < len(vertices):
+                bottom_up = False
+    if not distances:
+        for w in vertices:
+            for k in _bits(seen[w]):
+                reached[k].add(w)
+    return reached
+
+
+def _bits(mask: int):
+    """
+    Yield the positions of the set bits of mask
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
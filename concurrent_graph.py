@@ -0,0 +1,92 @@
+# Course: CS261 - Data Structures
+# Author: Alexandra Fren
+# Description: One writer and many reader threads sharing a directed graph. Readers take the current GraphSnapshot
+# and traverse it without locks; the writer edits a private SparseDirectedGraph and publish() swaps in a new snapshot
+# with a single reference assignment, so readers see either all of a batch of edits or none of it. Snapshots share
+# the CSR arrays with the writer until its next edit, which merges into new arrays and leaves published ones intact
+
+from contextlib import contextmanager
+import threading
+
+from d_graph import GraphSnapshot, SparseDirectedGraph
+
+
+class ConcurrentGraph:
+    """
+    Class to implement a directed graph with lock-free readers and batched, atomically published writes
+    - snapshot() returns the last published GraphSnapshot, it never changes
+    - edits are buffered in the writer graph and become visible only on publish() or at the end of batch()
+    - edit methods take a lock, so several writer threads are safe too, but they serialize
+    """
+
+    def __init__(self, graph=None):
+        """
+        Start from a copy of graph (any DirectedGraph), or from an empty graph
+        """
+        self._lock = threading.RLock()
+        self._graph = SparseDirectedGraph()
+        if graph is not None:
+            start = graph.snapshot()
+            self._graph = SparseDirectedGraph._from_csr(start._offsets, start._targets, start._weights)
+        self._published = self._graph.snapshot()
+
+    def snapshot(self) -> GraphSnapshot:
+        """
+        Return the last published snapshot, without taking any lock
+        """
+        return self._published
+
+    def add_vertex(self) -> int:
+        """
+        Add new vertex to the writer graph, return the number of vertices it has
+        """
+        with self._lock:
+            return self._graph.add_vertex()
+
+    def add_edge(self, src: int, dst: int, weight=1) -> None:
+        """
+        Add or update an edge in the writer graph
+        """
+        with self._lock:
+            self._graph.add_edge(src, dst, weight)
+
+    def remove_edge(self, src: int, dst: int) -> None:
+        """
+        Remove an edge from the writer graph
+        """
+        with self._lock:
+            self._graph.remove_edge(src, dst)
+
+    def add_edges(self, edges) -> None:
+        """
+        Add a batch of (src, dst, weight) edges to the writer graph
+        """
+        with self._lock:
+            self._graph.add_edges(edges)
+
+    def remove_edges(self, edges) -> None:
+        """
+        Remove a batch of (src, dst) edges from the writer graph
+        """
+        with self._lock:
+            self._graph.remove_edges(edges)
+
+    def publish(self) -> GraphSnapshot:
+        """
+        Merge the buffered edits and make the result the snapshot readers get, return it
+        Nothing is rebuilt if there were no edits since the last publish
+        """
+        with self._lock:
+            if self._graph._version != self._published.version:
+                self._published = self._graph.snapshot()
+            return self._published
+
+    @contextmanager
+    def batch(self):
+        """
+        Context manager holding the writer lock for a batch of edits and publishing them at the end
+        Edits of a batch that raises are kept in the writer graph but not published
+        """
+        with self._lock:
+            yield self
+            self.publish()
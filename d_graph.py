@@ -3,10 +3,37 @@
 # Assignment: Six (Final)
 # Description: This program creates a directed graph with an adjacency matrix, with methods to add a vertex or edge, remove an edge, get
 # all vertices or edges, check if provided nodes have a valid path between them, do a dfs or bfs, check for cycles using
-# bfs, and performs dijkstra calculations using a priority queue from heapq
+# an iterative three-color dfs, and performs dijkstra calculations using a priority queue from heapq. SparseDirectedGraph
+# offers the same API on top of compressed sparse row (CSR) storage for large graphs with few edges per vertex.
+# all_pairs_shortest_paths() uses a numpy Floyd-Warshall on dense graphs when numpy is installed. save() and load()
+# use the binary CSR file format from graph_io. reachable() answers from an index over the strongly connected components,
+# rebuilt on first use after an edit. minimum_spanning_forest() reads the edges as undirected. enable_cache() keeps
+# repeated query results until the next edit. snapshot() returns a read-only GraphSnapshot over frozen CSR arrays that
+# other threads can traverse without locks. abfs(), adfs() and adijkstra() run the traversals from asyncio code
 
+from array import array
+from bisect import bisect_left
 from collections import deque
 import heapq
+from operator import itemgetter
+
+import async_graph
+import bitset_bfs
+import graph_io
+import graph_pool
+import instrumentation
+import reachability
+import spanning_forest
+from result_cache import ResultCache, cached, DEFAULT_MAX_BYTES
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, all_pairs_shortest_paths() falls back to repeated dijkstra
+    np = None
+
+# all_pairs_shortest_paths() treats graphs with at least this fraction of the V^2 possible edges as dense
+APSP_DENSITY = 0.1
+
 
 class DirectedGraph:
     """
@@ -17,6 +44,21 @@ class DirectedGraph:
     - vertex names are integers
     """
 
+    # number of edges, kept up to date by the edit methods so num_edges() is O(1)
+    _edge_count = 0
+    # bumped by every edit, results derived from the graph (see _derived_value) are only reused for the same version
+    _version = 0
+    _derived = None
+    # ResultCache of query results while enable_cache() is on
+    _cache = None
+    # instrumentation.Instrumentation while enable_instrumentation() is on
+    _instrumentation = None
+    # per-thread [pushes, pops] counter of the instrumented dijkstra() call running on that thread, see instrumentation
+    _heap_counts = None
+    # class of the graphs built from this one, such as condensation(); None for its own class, read-only subclasses
+    # set a class that can be edited
+    _result_class = None
+
     def __init__(self, start_edges=None):
         """
         Store graph info as adjacency matrix
@@ -69,6 +111,7 @@ class DirectedGraph:
             counter += 1
         self.adj_matrix.append(new_list)
         self.v_count += 1
+        self._version += 1
         return self.v_count
 
     def add_edge(self, src: int, dst: int, weight=1) -> None:
@@ -78,7 +121,9 @@ class DirectedGraph:
         if src > self.v_count - 1 or dst > self.v_count - 1 or weight < 0 or src == dst or src < 0 or dst < 0:
             return
         else:
+            self._edge_count += (weight > 0) - (self.adj_matrix[src][dst] > 0)
             self.adj_matrix[src][dst] = weight
+            self._version += 1
             return
 
     def remove_edge(self, src: int, dst: int) -> None:
@@ -88,9 +133,138 @@ class DirectedGraph:
         if src > self.v_count - 1 or dst > self.v_count - 1 or src == dst or src < 0 or dst < 0:
             return
         else:
+            self._edge_count -= self.adj_matrix[src][dst] > 0
             self.adj_matrix[src][dst] = 0
+            self._version += 1
             return
 
+    @classmethod
+    def from_edges(cls, edges, n_vertices=None):
+        """
+        Build a graph from an iterable of (src, dst, weight) edges with storage allocated up front
+        - n_vertices defaults to the largest vertex id + 1
+        - invalid edges are skipped as add_edge() would, a repeated edge keeps its last weight
+        """
+        edges = list(edges)
+        if n_vertices is None:
+            n_vertices = 1 + max((max(u, v) for u, v, _ in edges), default=-1)
+        graph = cls()
+        graph._allocate(n_vertices)
+        graph.add_edges(edges)
+        return graph
+
+    def add_edges(self, edges) -> None:
+        """
+        Add a batch of (src, dst, weight) edges, skipping invalid ones as add_edge() would
+        """
+        n = self.v_count
+        batch = dict()
+        for src, dst, weight in edges:
+            if 0 <= src < n and 0 <= dst < n and src != dst and weight >= 0:
+                batch[(src, dst)] = weight
+        self._write_edges(batch)
+
+    def remove_edges(self, edges) -> None:
+        """
+        Remove a batch of (src, dst) edges, skipping invalid ones as remove_edge() would
+        """
+        n = self.v_count
+        batch = dict()
+        for src, dst in edges:
+            if 0 <= src < n and 0 <= dst < n and src != dst:
+                batch[(src, dst)] = 0
+        self._write_edges(batch)
+
+    def snapshot(self) -> 'GraphSnapshot':
+        """
+        Return read-only GraphSnapshot of the graph as it is now, safe to traverse from other threads without locks
+        """
+        offsets, targets, weights = self._csr()
+        return GraphSnapshot.freeze(offsets, targets, weights, self._version)
+
+    def save(self, path) -> None:
+        """
+        Write the graph to path in the binary CSR format of graph_io
+        """
+        offsets, targets, weights = self._csr()
+        graph_io.write_csr(path, True, offsets, targets, weights)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Load a graph written by save()
+        SparseDirectedGraph.load() uses the (memory-mapped) file arrays as its storage until the first edit,
+        DirectedGraph.load() copies the edges into a new matrix
+        """
+        data = graph_io.read_csr(path, mmap)
+        if not data.directed:
+            raise ValueError(f'{path} holds an undirected graph')
+        weights = data.weights
+        if weights is None:
+            weights = array('q', [1]) * len(data.targets)
+        elif not isinstance(weights, list) and (weights.format if isinstance(weights, memoryview)
+                                                else weights.typecode) != 'q':
+            # non-integer weights are kept in a plain list, as add_edge() does
+            weights = list(weights)
+        return cls._from_csr(data.offsets, data.targets, weights)
+
+    @classmethod
+    def read_edge_list(cls, path, fmt=None, chunk_size=graph_io.CHUNK_SIZE, skip_header=False):
+        """
+        Build a graph from an edge list text file of "src dst [weight]" rows (see graph_io.read_edge_chunks)
+        The file is read once in chunks, the vertex count grows to the largest id seen so far
+        """
+        graph = cls()
+        for chunk in graph_io.read_edge_chunks(path, fmt, True, chunk_size, skip_header):
+            graph._allocate(1 + max(max(u, v) for u, v, _ in chunk))
+            graph.add_edges(chunk)
+        return graph
+
+    def write_edge_list(self, path, fmt=None) -> int:
+        """
+        Stream the edges to an edge list text file without building the edge list, return edge count
+        """
+        return graph_io.write_edge_list(path, self.edges(), fmt)
+
+    def enable_cache(self, max_bytes=DEFAULT_MAX_BYTES) -> None:
+        """
+        Keep results of dfs, bfs, dijkstra, shortest_path and the dag_* paths until the next edit
+        - results are keyed by method and arguments, and callers get copies they are free to change
+        - least recently used results are dropped to stay under max_bytes
+        """
+        self._cache = ResultCache(max_bytes)
+
+    def disable_cache(self) -> None:
+        """
+        Stop caching query results and drop the cached ones
+        """
+        self._cache = None
+
+    def cache_stats(self) -> dict:
+        """
+        Return dict of cache hits, misses, evictions, invalidations, entries and bytes, or None if caching is off
+        """
+        return None if self._cache is None else self._cache.stats()
+
+    def enable_instrumentation(self, callback=None) -> instrumentation.Instrumentation:
+        """
+        Record calls of dfs, bfs, dijkstra, has_cycle and the edit methods on this graph, see instrumentation
+        callback(event) is called after every call, e.g. to feed an external metrics sink
+        """
+        return instrumentation.enable(self, callback)
+
+    def disable_instrumentation(self) -> None:
+        """
+        Stop recording calls, the graph runs the plain methods again
+        """
+        instrumentation.disable(self)
+
+    def instrumentation_stats(self) -> dict:
+        """
+        Return dict of recorded statistics per operation, or None if instrumentation is off
+        """
+        return None if self._instrumentation is None else self._instrumentation.report()
+
     def get_vertices(self) -> []:
         """
         Return list of vertices in the graph (any order)
@@ -106,17 +280,37 @@ class DirectedGraph:
         """
         Return list of edges in the graph (any order)
         """
-        edge_list = []
-        inner_counter = 0
-        outer_counter = 0
-        while outer_counter < self.v_count:
-            while inner_counter < self.v_count:
-                if self.adj_matrix[outer_counter][inner_counter] > 0:
-                    edge_list.append((outer_counter, inner_counter, self.adj_matrix[outer_counter][inner_counter]))
-                inner_counter += 1
-            inner_counter = 0
-            outer_counter += 1
-        return edge_list
+        return list(self.edges())
+
+    def edges(self):
+        """
+        Yield (src, dst, weight) for every edge without building a list, in the same order as get_edges()
+        """
+        for src in range(self.v_count):
+            for dst, weight in self._neighbors(src):
+                yield src, dst, weight
+
+    def neighbors(self, v: int):
+        """
+        Yield the vertices that v has an edge to, in ascending order
+        """
+        if 0 <= v < self.v_count:
+            for dst, _ in self._neighbors(v):
+                yield dst
+
+    def degree(self, v: int) -> int:
+        """
+        Return number of edges leaving v (0 if v is not in the graph)
+        """
+        if v < 0 or v >= self.v_count:
+            return 0
+        return sum(1 for _ in self._neighbors(v))
+
+    def num_edges(self) -> int:
+        """
+        Return number of edges in the graph
+        """
+        return self._edge_count
 
     def is_valid_path(self, path: []) -> bool:
         """
@@ -134,119 +328,1122 @@ class DirectedGraph:
                     return True
                 else:
                     check_val = path[counter + 1]
-                    if self.adj_matrix[path[counter]][check_val] == 0:
+                    if self._weight(path[counter], check_val) == 0:
                         return False
                 counter += 1
 
+    @cached
     def dfs(self, v_start, v_end=None) -> []:
         """
         Return list of vertices visited during DFS search
-        Vertices are picked in alphabetical order (see sort method used)
+        Vertices are picked in ascending order (neighbors come out of _neighbors() sorted)
+        """
+        return list(self.iter_dfs(v_start, v_end))
+
+    @cached
+    def bfs(self, v_start, v_end=None) -> []:
+        """
+        Return list of vertices visited during BFS search
+        Vertices are picked in ascending order (neighbors come out of _neighbors() sorted)
+        """
+        return list(self.iter_bfs(v_start, v_end))
+
+    def iter_dfs(self, v_start, v_end=None, stop=None, info=False):
+        """
+        Generator version of dfs(), yields vertices lazily in the same order
+        - with info=True yields (vertex, depth, parent) tuples, parent is None for v_start
+        - stops after yielding v_end, or the first vertex for which stop(vertex) is True
         """
         if v_start >= self.v_count:
-            return []
-        visitors = list()
+            return
+        visited = set()
         stack = deque()
-        stack.append(v_start)
+        stack.append((v_start, 0, None))
         while stack:
-            v = stack.pop()
-            if v == v_end:
-                visitors.append(v)
-                stack = deque()
-            if v not in visitors:
-                visitors.append(v)
-                counter = 0
-                holder = []
-                while counter < self.v_count:
-                    if self.adj_matrix[v][counter] > 0:
-                        holder.append(counter)
-                    counter += 1
-                holder.sort(reverse=True)
-                for i in holder:
-                    stack.append(i)
-        return visitors
+            v, depth, parent = stack.pop()
+            if v in visited:
+                continue
+            visited.add(v)
+            yield (v, depth, parent) if info else v
+            if v == v_end or (stop is not None and stop(v)):
+                return
+            holder = [(dst, depth + 1, v) for dst, _ in self._neighbors(v) if dst not in visited]
+            holder.reverse()
+            stack.extend(holder)
 
-    def bfs(self, v_start, v_end=None) -> []:
+    def iter_bfs(self, v_start, v_end=None, stop=None, info=False):
         """
-        Return list of vertices visited during BFS search
-        Vertices are picked in alphabetical order (see sort method used)
+        Generator version of bfs(), yields vertices lazily in the same order
+        - with info=True yields (vertex, depth, parent) tuples, depth is the hop count from v_start
+        - stops after yielding v_end, or the first vertex for which stop(vertex) is True
         """
         if v_start >= self.v_count:
-            return []
+            return
         h = deque()
-        visitors = list()
-        h.append(v_start)
+        visited = set()
+        h.append((v_start, 0, None))
         while h:
-            v = h.popleft()
-            if v == v_end:
-                visitors.append(v)
-                h = []
-            if v not in visitors:
-                visitors.append(v)
-                counter = 0
-                holder = []
-                while counter < self.v_count:
-                    if self.adj_matrix[v][counter] > 0:
-                        holder.append(counter)
-                    counter += 1
-                holder.sort()
-                for i in holder:
-                    h.append(i)
-        return visitors
-
-    def has_cycle(self):
+            v, depth, parent = h.popleft()
+            if v in visited:
+                continue
+            visited.add(v)
+            yield (v, depth, parent) if info else v
+            if v == v_end or (stop is not None and stop(v)):
+                return
+            h.extend([(dst, depth + 1, v) for dst, _ in self._neighbors(v) if dst not in visited])
+
+    async def abfs(self, v_start, v_end=None, timeout=None, cancel=None, offload=False, executor=None,
+                   every=async_graph.YIELD_EVERY) -> []:
+        """
+        Async bfs() that does not block the event loop, see async_graph.collect
+        Returns the vertices visited so far if timeout runs out or cancel is set
+        """
+        return await async_graph.collect(self.iter_bfs(v_start, v_end), timeout, cancel, offload, executor, every)
+
+    async def adfs(self, v_start, v_end=None, timeout=None, cancel=None, offload=False, executor=None,
+                   every=async_graph.YIELD_EVERY) -> []:
+        """
+        Async dfs() that does not block the event loop, see async_graph.collect
+        Returns the vertices visited so far if timeout runs out or cancel is set
+        """
+        return await async_graph.collect(self.iter_dfs(v_start, v_end), timeout, cancel, offload, executor, every)
+
+    def multi_bfs(self, sources, distances=False, direction='auto') -> []:
+        """
+        Return one result per source vertex: the set of vertices BFS from it reaches, or with distances=True
+        a {vertex: hop count} dict (empty for sources not in the graph)
+        Sources are searched 64 at a time with bit-parallel frontiers, see bitset_bfs
+        """
+        valid = [s for s in sources if 0 <= s < self.v_count]
+        found = bitset_bfs.multi_bfs(valid, range(self.v_count), self._out_ids, self._in_ids, self.v_count,
+                                     distances, direction)
+        found.reverse()
+        return [found.pop() if 0 <= s < self.v_count else ({} if distances else set()) for s in sources]
+
+    def map_sources(self, algorithm, sources, workers=None, chunk_size=None) -> []:
+        """
+        Return [self.<algorithm>(s) for s in sources] computed on a pool of worker processes, see graph_pool
+        algorithm is a method name such as 'dijkstra' or a picklable function (graph, source)
+        Workers memory-map the graph as a SparseDirectedGraph, which gives the same results as the dense class
+        """
+        return graph_pool.map_sources(self, algorithm, sources, workers, chunk_size, SparseDirectedGraph.load)
+
+    def _out_ids(self, v: int) -> []:
+        """
+        Return list of the vertices v has an edge to
+        """
+        return [dst for dst, _ in self._neighbors(v)]
+
+    def _in_ids(self, v: int) -> []:
+        """
+        Return list of the vertices that have an edge to v
+        """
+        return [src for src, _ in self._in_neighbors(v)]
+
+    def has_cycle(self, witness=False):
         """
         Return True if graph contains a cycle, False otherwise
+        With witness=True, return the vertices of one cycle in edge order instead ([] if there is none)
+        Iterative three-color DFS, O(V + E); without witness the cached topological_order() answers instead
         """
-        if len(self.get_vertices()) == 0 or len(self.get_vertices()) == 1:
-            return False
-        for index in range(self.v_count):
-            reachable = []
-            stack = [self.get_vertices()[index]]
+        if not witness:
+            return self._topological_order() is None
+        # 0 = not seen yet, 1 = on the current DFS path, 2 = finished
+        color = bytearray(self.v_count)
+        parent = [-1] * self.v_count
+        for root in range(self.v_count):
+            if color[root]:
+                continue
+            color[root] = 1
+            stack = [(root, iter(self._neighbors(root)))]
             while stack:
-                v = stack.pop()
-                if v not in reachable:
-                    reachable.append(v)
-                for j in range(self.v_count):
-                    if j not in reachable and self.adj_matrix[v][j] > 0:
-                        stack.append(j)
-                    if j in reachable and self.adj_matrix[v][j] > 0:
-                        if v in self.bfs(j):
-                            return True
-        return False
+                v, edges = stack[-1]
+                for dst, _ in edges:
+                    if color[dst] == 1:
+                        # back edge v -> dst closes a cycle along the current path
+                        cycle = [v]
+                        while cycle[-1] != dst:
+                            cycle.append(parent[cycle[-1]])
+                        cycle.reverse()
+                        return cycle
+                    if color[dst] == 0:
+                        color[dst] = 1
+                        parent[dst] = v
+                        stack.append((dst, iter(self._neighbors(dst))))
+                        break
+                else:
+                    color[v] = 2
+                    stack.pop()
+        return []
+
+    def topological_order(self):
+        """
+        Return list of all vertices with every edge pointing forward, or None if the graph has a cycle
+        Kahn's algorithm, O(V + E); the order is cached until the graph is edited
+        """
+        order = self._topological_order()
+        return None if order is None else list(order)
+
+    @cached
+    def dag_shortest_paths(self, src: int):
+        """
+        Return list of shortest distances from src (inf if unreachable) like dijkstra(), or None if the graph has a cycle
+        Relaxes edges in topological order, O(V + E) with no heap
+        """
+        return self._dag_paths(src, float('inf'), min)
 
+    @cached
+    def dag_longest_paths(self, src: int):
+        """
+        Return list of longest path lengths from src (-inf if unreachable), or None if the graph has a cycle
+        """
+        return self._dag_paths(src, float('-inf'), max)
+
+    def _dag_paths(self, src: int, unreached, better):
+        """
+        Relax every edge out of the vertices reachable from src in topological order, keeping better(old, new)
+        """
+        order = self._topological_order()
+        if order is None:
+            return None
+        distances = [unreached] * self.v_count
+        if src < 0 or src >= self.v_count:
+            return distances
+        distances[src] = 0
+        for v in order:
+            d = distances[v]
+            if d == unreached:
+                continue
+            for j, weight in self._neighbors(v):
+                if distances[j] == unreached:
+                    distances[j] = d + weight
+                else:
+                    distances[j] = better(distances[j], d + weight)
+        return distances
+
+    def _topological_order(self):
+        """
+        Return cached topological order (shared, do not modify), or None if the graph has a cycle
+        """
+        return self._derived_value('topological_order', self._kahn)
+
+    def _kahn(self):
+        """
+        Return topological order by Kahn's algorithm, or None if some vertices are left on a cycle
+        """
+        in_degree = array('q', [0]) * self.v_count
+        for _, dst, _ in self.edges():
+            in_degree[dst] += 1
+        h = deque(v for v in range(self.v_count) if in_degree[v] == 0)
+        order = array('q')
+        while h:
+            v = h.popleft()
+            order.append(v)
+            for j, _ in self._neighbors(v):
+                in_degree[j] -= 1
+                if in_degree[j] == 0:
+                    h.append(j)
+        return order if len(order) == self.v_count else None
+
+    def _derived_value(self, name: str, build):
+        """
+        Return build() for the current version of the graph, reusing the last result until the next edit
+        """
+        if self._derived is None:
+            self._derived = dict()
+        cached = self._derived.get(name)
+        if cached is not None and cached[0] == self._version:
+            return cached[1]
+        value = build()
+        self._derived[name] = (self._version, value)
+        return value
+
+    def strongly_connected_components(self, reuse=False) -> array:
+        """
+        Return array of component ids, one per vertex; ids are numbered in topological order of the condensation
+        Iterative Tarjan over the CSR arrays, O(V + E) with no recursion
+        With reuse=True the components are computed once and reused until the next edit
+        """
+        if reuse:
+            return array('q', self._derived_value('scc', self._tarjan))
+        return self._tarjan()
+
+    def condensation(self, reuse=False):
+        """
+        Return graph of the same class (SparseDirectedGraph for read-only graphs) with one vertex per strongly
+        connected component
+        - edge a -> b if any edge leads from component a to component b, weighted by the lightest such edge
+        - vertex ids are the ids from strongly_connected_components(), so the result is a DAG in topological order
+        """
+        comp = self._derived_value('scc', self._tarjan) if reuse else self._tarjan()
+        lightest = dict()
+        for src, dst, weight in self.edges():
+            key = (comp[src], comp[dst])
+            if key[0] != key[1] and (key not in lightest or weight < lightest[key]):
+                lightest[key] = weight
+        n_components = max(comp) + 1 if comp else 0
+        result_class = self._result_class or type(self)
+        return result_class.from_edges([(a, b, w) for (a, b), w in lightest.items()], n_components)
+
+    def reachable(self, u: int, v: int) -> bool:
+        """
+        Return True if there is a path from u to v (every vertex reaches itself), False if not or if either is invalid
+        Answered by a reachability.ReachabilityIndex that is built on first use and rebuilt lazily after edits
+        """
+        if u < 0 or v < 0 or u >= self.v_count or v >= self.v_count:
+            return False
+        return self._derived_value('reachability', self._reachability_index).reachable(u, v)
+
+    def _reachability_index(self) -> reachability.ReachabilityIndex:
+        """
+        Return new reachability index from the (reused) components and the edges between them
+        """
+        comp = self._derived_value('scc', self._tarjan)
+        successors = [set() for _ in range(max(comp) + 1 if comp else 0)]
+        offsets, targets, _ = self._csr()
+        for src in range(self.v_count):
+            a = comp[src]
+            out = successors[a]
+            for pos in range(offsets[src], offsets[src + 1]):
+                b = comp[targets[pos]]
+                if b != a:
+                    out.add(b)
+        return reachability.ReachabilityIndex(comp, [sorted(out) for out in successors])
+
+    def _tarjan(self) -> array:
+        """
+        Return array of strongly connected component ids, see strongly_connected_components()
+        """
+        offsets, targets, _ = self._csr()
+        n = self.v_count
+        index = array('q', [-1]) * n
+        low = array('q', [0]) * n
+        comp = array('q', [-1]) * n
+        # next edge to look at for every vertex on the DFS path
+        pos = array('q', offsets)
+        on_stack = bytearray(n)
+        stack = array('q')
+        counter = found = 0
+        for root in range(n):
+            if index[root] >= 0:
+                continue
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = 1
+            path = [root]
+            while path:
+                v = path[-1]
+                for p in range(pos[v], offsets[v + 1]):
+                    w = targets[p]
+                    if index[w] < 0:
+                        pos[v] = p + 1
+                        index[w] = low[w] = counter
+                        counter += 1
+                        stack.append(w)
+                        on_stack[w] = 1
+                        path.append(w)
+                        break
+                    if on_stack[w] and index[w] < low[v]:
+                        low[v] = index[w]
+                else:
+                    path.pop()
+                    if path and low[v] < low[path[-1]]:
+                        low[path[-1]] = low[v]
+                    if low[v] == index[v]:
+                        # v is the root of a component, everything above it on the stack belongs to it
+                        while True:
+                            w = stack.pop()
+                            on_stack[w] = 0
+                            comp[w] = found
+                            if w == v:
+                                break
+                        found += 1
+        # Tarjan finishes sink components first, flip the ids so edges go from lower to higher ids
+        for v in range(n):
+            comp[v] = found - 1 - comp[v]
+        return comp
+
+    @cached
     def dijkstra(self, src: int) -> []:
         """
         Performs calculations for the shortest path between each vertex in matrix
+        Returns list of distances from src, inf for vertices that are not reachable
+        """
+        distances = [float('inf')] * self.v_count
+        if src < 0 or src >= self.v_count:
+            return distances
+        counts = None if self._heap_counts is None else self._heap_counts.current
+        self._dijkstra_from(src, distances, array('q', [-1]) * self.v_count, bytearray(self.v_count), [],
+                            counts=counts)
+        return distances
+
+    def iter_dijkstra(self, src: int):
+        """
+        Generator version of dijkstra(), yields (vertex, distance) pairs as vertices are settled, nearest first
         """
-        visited = {}
-        heap = []
-        distances = {}
-        for i in self.get_vertices():
-            # default should be inf if the vertex is not reachable, value will be check to see if its less later
-            distances[i] = float('inf')
-        # push the src value, with a priority 0 to the heap
-        heapq.heapify(heap)
-        heapq.heappush(heap, (0, src))
+        if src < 0 or src >= self.v_count:
+            return
+        dist = [float('inf')] * self.v_count
+        settled = bytearray(self.v_count)
+        dist[src] = 0
+        heap = [(0, src)]
         while heap:
-            v = heapq.heappop(heap)
-            # d is the distance/priority of the popped value
-            d = v[0]
-            v = v[1]
-            if v not in visited:
-                visited[v] = d
-            for j in range(self.v_count):
-                total_distance = d + self.adj_matrix[v][j]
-                if self.adj_matrix[v][j] > 0 and j not in visited and total_distance < distances[j]:
-                    distances[j] = total_distance
+            d, v = heapq.heappop(heap)
+            if settled[v]:
+                continue
+            settled[v] = 1
+            yield v, d
+            for j, weight in self._neighbors(v):
+                total_distance = d + weight
+                if total_distance < dist[j]:
+                    dist[j] = total_distance
                     heapq.heappush(heap, (total_distance, j))
-        return_val = []
-        for i in self.get_vertices():
-            if i in visited:
-                return_val.append(visited[i])
+
+    async def adijkstra(self, src: int, timeout=None, cancel=None, offload=False, executor=None,
+                        every=async_graph.YIELD_EVERY) -> []:
+        """
+        Async dijkstra() that does not block the event loop, see async_graph.collect
+        If timeout runs out or cancel is set, only the vertices settled so far have their (final) distance,
+        the others are inf
+        """
+        distances = [float('inf')] * self.v_count
+        for v, d in await async_graph.collect(self.iter_dijkstra(src), timeout, cancel, offload, executor, every):
+            distances[v] = d
+        return distances
+
+    @cached
+    def shortest_path(self, src: int, dst: int):
+        """
+        Return (distance, path) for a shortest path src -> dst, or (inf, []) if dst is not reachable
+        Dijkstra that stops as soon as dst is settled
+        """
+        if src < 0 or dst < 0 or src >= self.v_count or dst >= self.v_count:
+            return float('inf'), []
+        distances = [float('inf')] * self.v_count
+        pred = array('q', [-1]) * self.v_count
+        self._dijkstra_from(src, distances, pred, bytearray(self.v_count), [], dst)
+        if distances[dst] == float('inf'):
+            return float('inf'), []
+        return distances[dst], _walk_back(pred, src, dst)
+
+    def bidirectional_shortest_path(self, src: int, dst: int):
+        """
+        Return (distance, path) like shortest_path(), searching forward from src and backward from dst
+        at the same time and stopping once the two frontiers cannot improve the best meeting point
+        """
+        inf = float('inf')
+        if src < 0 or dst < 0 or src >= self.v_count or dst >= self.v_count:
+            return inf, []
+        if src == dst:
+            return 0, [src]
+        n = self.v_count
+        # index 0 is the forward search from src, index 1 the backward search from dst
+        dist = ([inf] * n, [inf] * n)
+        pred = (array('q', [-1]) * n, array('q', [-1]) * n)
+        settled = (bytearray(n), bytearray(n))
+        heaps = ([(0, src)], [(0, dst)])
+        expand = (self._neighbors, self._in_neighbors)
+        dist[0][src] = 0
+        dist[1][dst] = 0
+        best, meet = inf, -1
+        while heaps[0] and heaps[1]:
+            if heaps[0][0][0] + heaps[1][0][0] >= best:
+                break
+            side = 0 if len(heaps[0]) <= len(heaps[1]) else 1
+            d, v = heapq.heappop(heaps[side])
+            if settled[side][v]:
+                continue
+            settled[side][v] = 1
+            near, far = dist[side], dist[1 - side]
+            for j, weight in expand[side](v):
+                total_distance = d + weight
+                if total_distance < near[j]:
+                    near[j] = total_distance
+                    pred[side][j] = v
+                    heapq.heappush(heaps[side], (total_distance, j))
+                if near[j] + far[j] < best:
+                    best, meet = near[j] + far[j], j
+        if meet < 0:
+            return inf, []
+        path = _walk_back(pred[0], src, meet)
+        while path[-1] != dst:
+            path.append(pred[1][path[-1]])
+        return best, path
+
+    def astar_path(self, src: int, dst: int, heuristic):
+        """
+        Return (distance, path) like shortest_path(), with A* search ordered by distance + heuristic(v)
+        heuristic(v) must never overestimate the remaining distance from v to dst
+        """
+        inf = float('inf')
+        if src < 0 or dst < 0 or src >= self.v_count or dst >= self.v_count:
+            return inf, []
+        distances = [inf] * self.v_count
+        pred = array('q', [-1]) * self.v_count
+        distances[src] = 0
+        heap = [(heuristic(src), 0, src)]
+        while heap:
+            _, d, v = heapq.heappop(heap)
+            if d > distances[v]:
+                # stale entry, v was reached more cheaply after this was pushed
+                continue
+            if v == dst:
+                return d, _walk_back(pred, src, dst)
+            for j, weight in self._neighbors(v):
+                total_distance = d + weight
+                if total_distance < distances[j]:
+                    distances[j] = total_distance
+                    pred[j] = v
+                    heapq.heappush(heap, (total_distance + heuristic(j), total_distance, j))
+        return inf, []
+
+    def minimum_spanning_forest(self, method='kruskal'):
+        """
+        Return (total weight, [(u, v, weight), ...]) of a minimum spanning forest, reading every edge as undirected
+        - method 'kruskal' sorts the CSR edge arrays and joins trees with union-find, 'prim' grows each tree from a
+          lazy heap; both are in spanning_forest
+        - edges in both directions are two candidates for the same undirected edge, the lighter one can be picked
+        """
+        offsets, targets, weights = self._csr()
+        if method == 'kruskal':
+            sources = array('q')
+            for v in range(self.v_count):
+                sources.extend(array('q', [v]) * (offsets[v + 1] - offsets[v]))
+            picked = spanning_forest.kruskal(self.v_count, sources, targets, weights)
+            forest = [(sources[i], targets[i], weights[i]) for i in picked]
+        elif method == 'prim':
+            def neighbors(v):
+                return list(self._neighbors(v)) + list(self._in_neighbors(v))
+            forest = spanning_forest.prim(range(self.v_count), neighbors)
+        else:
+            raise ValueError(f'unknown method {method!r}')
+        return sum(weight for _, _, weight in forest), forest
+
+    def all_pairs_shortest_paths(self, method='auto', predecessors=False):
+        """
+        Return matrix of shortest distances, dist[i][j] is the distance from i to j (inf if unreachable)
+        - method 'floyd-warshall' (needs numpy), 'dijkstra', or 'auto' to pick by edge density
+        - the matrix is a float numpy array when numpy is installed, else a list of array('d') rows
+        - with predecessors=True return (dist, pred), pred[i][j] is the vertex before j on a
+          shortest path from i (-1 if none), see reconstruct_path()
+        """
+        n = self.v_count
+        if method == 'auto':
+            dense = n > 0 and self.num_edges() >= APSP_DENSITY * n * n
+            method = 'floyd-warshall' if dense and np is not None else 'dijkstra'
+        if method == 'floyd-warshall':
+            if np is None:
+                raise ImportError('floyd-warshall needs numpy')
+            dist, pred = self._floyd_warshall(self.get_edges(), predecessors)
+        elif method == 'dijkstra':
+            dist, pred = self._repeated_dijkstra(predecessors)
+        else:
+            raise ValueError(f'unknown method {method!r}')
+        return (dist, pred) if predecessors else dist
+
+    @staticmethod
+    def reconstruct_path(pred, src: int, dst: int) -> []:
+        """
+        Return list of vertices on the shortest path src -> dst from an all_pairs_shortest_paths()
+        predecessor matrix, or [] if dst is not reachable
+        """
+        if src != dst and pred[src][dst] < 0:
+            return []
+        return _walk_back(pred[src], src, dst)
+
+    def _floyd_warshall(self, edges: [], predecessors: bool):
+        """
+        Vectorized Floyd-Warshall, one O(V^2) numpy step per intermediate vertex
+        """
+        n = self.v_count
+        dist = np.full((n, n), np.inf)
+        np.fill_diagonal(dist, 0)
+        pred = np.full((n, n), -1, dtype=np.int64) if predecessors else None
+        for src, dst, weight in edges:
+            dist[src, dst] = weight
+            if predecessors:
+                pred[src, dst] = src
+        for k in range(n):
+            through_k = dist[:, k, None] + dist[None, k, :]
+            if predecessors:
+                better = through_k < dist
+                dist[better] = through_k[better]
+                pred[better] = np.broadcast_to(pred[k], (n, n))[better]
+            else:
+                np.minimum(dist, through_k, out=dist)
+        return dist, pred
+
+    def _repeated_dijkstra(self, predecessors: bool):
+        """
+        Heap dijkstra from every vertex, sharing one set of work buffers between runs
+        """
+        n = self.v_count
+        inf = float('inf')
+        dist_buf = array('d', [inf]) * n
+        pred_buf = array('q', [-1]) * n
+        settled = bytearray(n)
+        touched = []
+        if np is not None:
+            dist = np.empty((n, n))
+            pred = np.empty((n, n), dtype=np.int64) if predecessors else None
+        else:
+            dist = []
+            pred = [] if predecessors else None
+        for src in range(n):
+            self._dijkstra_from(src, dist_buf, pred_buf, settled, touched)
+            if np is not None:
+                dist[src] = dist_buf
+                if predecessors:
+                    pred[src] = pred_buf
             else:
-                return_val.append(float('inf'))
-        return return_val
+                dist.append(array('d', dist_buf))
+                if predecessors:
+                    pred.append(array('q', pred_buf))
+            # reset only the entries this run wrote to
+            for v in touched:
+                dist_buf[v] = inf
+                pred_buf[v] = -1
+                settled[v] = 0
+            touched.clear()
+        return dist, pred
+
+    def _dijkstra_from(self, src: int, dist, pred, settled: bytearray, touched: [], dst=None, counts=None) -> None:
+        """
+        Heap dijkstra from src into caller-owned buffers (dist all inf, pred all -1, settled all 0)
+        Every vertex written to is appended to touched; stops early once dst is settled
+        Stale heap entries are skipped when popped instead of being removed (lazy deletion)
+        counts, if given, is a [pushes, pops] list the heap operations of this run are added to
+        """
+        inf = float('inf')
+        dist[src] = 0
+        touched.append(src)
+        heap = [(0, src)]
+        pops = 0
+        while heap:
+            d, v = heapq.heappop(heap)
+            pops += 1
+            if settled[v]:
+                continue
+            settled[v] = 1
+            if v == dst:
+                break
+            for j, weight in self._neighbors(v):
+                total_distance = d + weight
+                if total_distance < dist[j]:
+                    if dist[j] == inf:
+                        touched.append(j)
+                    dist[j] = total_distance
+                    pred[j] = v
+                    heapq.heappush(heap, (total_distance, j))
+        if counts is not None:
+            # every entry, the starting one included, was pushed and is either popped or still in the heap
+            counts[0] += pops + len(heap)
+            counts[1] += pops
+
+    def _neighbors(self, v: int):
+        """
+        Return iterable of (dst, weight) pairs for the outgoing edges of v, in ascending dst order
+        """
+        return [(dst, weight) for dst, weight in enumerate(self.adj_matrix[v]) if weight > 0]
+
+    def _allocate(self, n_vertices: int) -> None:
+        """
+        Grow the graph to n_vertices vertices in one step
+        """
+        extra = n_vertices - self.v_count
+        if extra <= 0:
+            return
+        for row in self.adj_matrix:
+            row.extend([0] * extra)
+        self.adj_matrix.extend([0] * n_vertices for _ in range(extra))
+        self.v_count = n_vertices
+        self._version += 1
+
+    def _write_edges(self, batch: dict) -> None:
+        """
+        Store already validated {(src, dst): weight} entries, weight 0 removes the edge
+        """
+        for (src, dst), weight in batch.items():
+            row = self.adj_matrix[src]
+            self._edge_count += (weight > 0) - (row[dst] > 0)
+            row[dst] = weight
+        if batch:
+            self._version += 1
+
+    def _csr(self):
+        """
+        Return (offsets, targets, weights) CSR arrays of the graph
+        """
+        offsets = array('q', [0])
+        targets = array('q')
+        weights = []
+        for src in range(self.v_count):
+            for dst, weight in self._neighbors(src):
+                targets.append(dst)
+                weights.append(weight)
+            offsets.append(len(targets))
+        return offsets, targets, weights
+
+    @classmethod
+    def _from_csr(cls, offsets, targets, weights):
+        """
+        Return new graph holding the edges of the given CSR arrays
+        """
+        graph = cls()
+        graph._allocate(len(offsets) - 1)
+        for src in range(graph.v_count):
+            row = graph.adj_matrix[src]
+            for pos in range(offsets[src], offsets[src + 1]):
+                row[targets[pos]] = weights[pos]
+        graph._edge_count = len(targets)
+        return graph
+
+    def _in_neighbors(self, v: int):
+        """
+        Return iterable of (src, weight) pairs for the incoming edges of v, in ascending src order
+        """
+        return [(src, self.adj_matrix[src][v]) for src in range(self.v_count) if self.adj_matrix[src][v] > 0]
+
+    def _weight(self, src: int, dst: int):
+        """
+        Return weight of the edge src -> dst, or 0 if there is no such edge
+        """
+        if src < 0 or dst < 0 or src >= self.v_count or dst >= self.v_count:
+            return 0
+        return self.adj_matrix[src][dst]
+
+
+class SparseDirectedGraph(DirectedGraph):
+    """
+    Directed weighted graph stored in compressed sparse row (CSR) form
+    - same public API and rules as DirectedGraph
+    - memory is O(V + E) and neighbor scans are O(out-degree)
+    - edge edits are buffered and merged into the CSR arrays on the next read
+    - adj_matrix is a read-only view that builds dense rows on demand
+    """
+
+    def __init__(self, start_edges=None):
+        """
+        Store graph info as CSR arrays: the outgoing edges of vertex v are
+        targets[offsets[v]:offsets[v + 1]] (sorted) with matching weights
+        Weights are an int64 array, or a plain list once a non-integer weight is added
+        Graphs from load() start out with read-only memoryviews over the file instead of arrays
+        """
+        self._offsets = array('q', [0])
+        self._targets = array('q')
+        self._weights = array('q')
+        self._pending = {}
+        self._reverse = None
+        super().__init__(start_edges)
+        self.adj_matrix = _CSRMatrixView(self)
+
+    def add_vertex(self) -> int:
+        """
+        Add new vertex to the graph
+        """
+        self._own_offsets()
+        self._offsets.append(self._offsets[-1])
+        self._reverse = None
+        self.v_count += 1
+        self._version += 1
+        return self.v_count
+
+    def add_edge(self, src: int, dst: int, weight=1) -> None:
+        """
+        Add edge to the graph if valid inputs
+        """
+        if src > self.v_count - 1 or dst > self.v_count - 1 or weight < 0 or src == dst or src < 0 or dst < 0:
+            return
+        self._edge_count += (weight > 0) - (self._current_weight(src, dst) > 0)
+        self._pending[(src, dst)] = weight
+        self._version += 1
+
+    def remove_edge(self, src: int, dst: int) -> None:
+        """
+        Remove edge from the graph
+        """
+        if src > self.v_count - 1 or dst > self.v_count - 1 or src == dst or src < 0 or dst < 0:
+            return
+        self._edge_count -= self._current_weight(src, dst) > 0
+        self._pending[(src, dst)] = 0
+        self._version += 1
+
+    def add_edges(self, edges) -> None:
+        """
+        Add a batch of (src, dst, weight) edges, skipping invalid ones as add_edge() would
+        A graph without edges builds its CSR arrays straight from the batch, without buffering it
+        """
+        if self._targets or self._pending:
+            super().add_edges(edges)
+            return
+        srcs, dsts = array('q'), array('q')
+        weights = self._collect_edges(edges, srcs, dsts, array('q'))
+        self._load_edges(srcs, dsts, weights)
+
+    @classmethod
+    def read_edge_list(cls, path, fmt=None, chunk_size=graph_io.CHUNK_SIZE, skip_header=False):
+        """
+        Build a graph from an edge list text file of "src dst [weight]" rows (see graph_io.read_edge_chunks)
+        The chunks are collected into flat edge arrays and the CSR arrays are built once at the end
+        """
+        graph = cls()
+        srcs, dsts, weights = array('q'), array('q'), array('q')
+        for chunk in graph_io.read_edge_chunks(path, fmt, True, chunk_size, skip_header):
+            graph._allocate(1 + max(max(u, v) for u, v, _ in chunk))
+            weights = graph._collect_edges(chunk, srcs, dsts, weights)
+        graph._load_edges(srcs, dsts, weights)
+        return graph
+
+    def degree(self, v: int) -> int:
+        """
+        Return number of edges leaving v (0 if v is not in the graph)
+        """
+        if v < 0 or v >= self.v_count:
+            return 0
+        self._compact()
+        return self._offsets[v + 1] - self._offsets[v]
+
+    def snapshot(self) -> 'GraphSnapshot':
+        """
+        Return read-only GraphSnapshot of the graph as it is now, safe to traverse from other threads without locks
+        The merged CSR arrays are handed over without copying: the graph keeps read-only views of them too, and
+        later edits build new arrays (see _compact and _own_offsets), so both share everything until the next edit
+        """
+        self._compact()
+        self._offsets, self._targets = _read_only(self._offsets), _read_only(self._targets)
+        if not isinstance(self._weights, list):
+            self._weights = _read_only(self._weights)
+        return GraphSnapshot.freeze(self._offsets, self._targets, self._weights, self._version)
+
+    def _allocate(self, n_vertices: int) -> None:
+        """
+        Grow the graph to n_vertices vertices in one step
+        """
+        extra = n_vertices - self.v_count
+        if extra <= 0:
+            return
+        self._own_offsets()
+        self._offsets.extend(array('q', [self._offsets[-1]]) * extra)
+        self._reverse = None
+        self.v_count = n_vertices
+        self._version += 1
+
+    def _write_edges(self, batch: dict) -> None:
+        """
+        Buffer already validated {(src, dst): weight} entries, weight 0 removes the edge
+        """
+        for (src, dst), weight in batch.items():
+            self._edge_count += (weight > 0) - (self._current_weight(src, dst) > 0)
+        self._pending.update(batch)
+        if batch:
+            self._version += 1
+
+    def _csr(self):
+        """
+        Return (offsets, targets, weights) CSR arrays of the graph
+        """
+        self._compact()
+        return self._offsets, self._targets, self._weights
+
+    @classmethod
+    def _from_csr(cls, offsets, targets, weights):
+        """
+        Return new graph that uses the given CSR arrays (or read-only memoryviews) as its storage
+        """
+        graph = cls()
+        graph._offsets, graph._targets, graph._weights = offsets, targets, weights
+        graph.v_count = len(offsets) - 1
+        graph._edge_count = len(targets)
+        return graph
+
+    def _own_offsets(self) -> None:
+        """
+        Copy offsets mapped from a file into an array before they are extended
+        """
+        if not isinstance(self._offsets, array):
+            self._offsets = array('q', self._offsets)
+
+    def _neighbors(self, v: int):
+        """
+        Return iterable of (dst, weight) pairs for the outgoing edges of v, in ascending dst order
+        """
+        self._compact()
+        lo, hi = self._offsets[v], self._offsets[v + 1]
+        return zip(self._targets[lo:hi], self._weights[lo:hi])
+
+    def _weight(self, src: int, dst: int):
+        """
+        Return weight of the edge src -> dst, or 0 if there is no such edge
+        """
+        if src < 0 or dst < 0 or src >= self.v_count or dst >= self.v_count:
+            return 0
+        self._compact()
+        return self._stored_weight(src, dst)
+
+    def _current_weight(self, src: int, dst: int):
+        """
+        Return weight of the edge src -> dst including buffered edits, without merging them
+        """
+        weight = self._pending.get((src, dst))
+        return self._stored_weight(src, dst) if weight is None else weight
+
+    def _stored_weight(self, src: int, dst: int):
+        """
+        Return weight of the edge src -> dst in the CSR arrays, or 0 if there is none there
+        """
+        lo, hi = self._offsets[src], self._offsets[src + 1]
+        pos = bisect_left(self._targets, dst, lo, hi)
+        if pos < hi and self._targets[pos] == dst:
+            return self._weights[pos]
+        return 0
+
+    def _in_neighbors(self, v: int):
+        """
+        Return iterable of (src, weight) pairs for the incoming edges of v, in ascending src order
+        Uses a transposed copy of the CSR arrays, built on first use after each edit
+        """
+        self._compact()
+        if self._reverse is None:
+            self._reverse = self._transpose()
+        offsets, sources, weights = self._reverse
+        lo, hi = offsets[v], offsets[v + 1]
+        return zip(sources[lo:hi], weights[lo:hi])
+
+    def _transpose(self):
+        """
+        Return (offsets, sources, weights) CSR arrays of the reversed graph, by counting sort on dst
+        """
+        n = self.v_count
+        offsets = array('q', [0]) * (n + 1)
+        for dst in self._targets:
+            offsets[dst + 1] += 1
+        for v in range(n):
+            offsets[v + 1] += offsets[v]
+        fill = array('q', offsets[:n])
+        sources = array('q', [0]) * len(self._targets)
+        # same storage type and length as self._weights, every slot is overwritten below
+        weights = list(self._weights) if isinstance(self._weights, list) else array('q', self._weights)
+        for src in range(n):
+            for pos in range(self._offsets[src], self._offsets[src + 1]):
+                dst = self._targets[pos]
+                sources[fill[dst]] = src
+                weights[fill[dst]] = self._weights[pos]
+                fill[dst] += 1
+        return offsets, sources, weights
+
+    def _compact(self) -> None:
+        """
+        Merge buffered edge edits into the CSR arrays
+        Untouched rows are copied as whole slices, so the cost is O(V + E) per merge, not per edit
+        """
+        if not self._pending:
+            return
+        if not self._targets:
+            self._build_csr()
+            return
+        rows = {}
+        for (src, dst), weight in self._pending.items():
+            rows.setdefault(src, {})[dst] = weight
+        self._pending = {}
+
+        old_offsets, old_targets, old_weights = self._offsets, self._targets, self._weights
+        if not isinstance(old_weights, list) and any(not isinstance(w, int) for r in rows.values() for w in r.values()):
+            # non-integer weights are kept as given (a float array would turn 3 into 3.0)
+            old_weights = list(old_weights)
+        offsets = array('q', [0])
+        targets = array('q')
+        weights = list() if isinstance(old_weights, list) else array('q')
+        done = 0
+        for v in sorted(rows):
+            # copy the unchanged rows between the previous dirty row and this one
+            shift = len(targets) - old_offsets[done]
+            targets.extend(old_targets[old_offsets[done]:old_offsets[v]])
+            weights.extend(old_weights[old_offsets[done]:old_offsets[v]])
+            offsets.extend(o + shift for o in old_offsets[done + 1:v + 1])
+
+            lo, hi = old_offsets[v], old_offsets[v + 1]
+            row = dict(zip(old_targets[lo:hi], old_weights[lo:hi]))
+            row.update(rows[v])
+            for dst in sorted(row):
+                if row[dst] > 0:
+                    targets.append(dst)
+                    weights.append(row[dst])
+            offsets.append(len(targets))
+            done = v + 1
+        shift = len(targets) - old_offsets[done]
+        targets.extend(old_targets[old_offsets[done]:])
+        weights.extend(old_weights[old_offsets[done]:])
+        offsets.extend(o + shift for o in old_offsets[done + 1:])
+        self._offsets, self._targets, self._weights = offsets, targets, weights
+        self._reverse = None
+
+    def _collect_edges(self, edges, srcs: array, dsts: array, weights):
+        """
+        Append the valid (src, dst, weight) edges to the flat srcs, dsts and weights arrays, return weights
+        weights becomes a plain list once a non-integer weight is added, as in _compact
+        """
+        n = self.v_count
+        for src, dst, weight in edges:
+            if 0 <= src < n and 0 <= dst < n and src != dst and weight >= 0:
+                if not isinstance(weight, int) and not isinstance(weights, list):
+                    weights = list(weights)
+                srcs.append(src)
+                dsts.append(dst)
+                weights.append(weight)
+        return weights
+
+    def _load_edges(self, srcs: array, dsts: array, weights) -> None:
+        """
+        Build the CSR arrays of a graph without edges from flat edge arrays, emptying them
+        Counting sort on src, then each row is sorted by dst; a repeated edge keeps its last weight, weight 0 drops it
+        """
+        n, m = self.v_count, len(srcs)
+        if not m:
+            return
+        offsets = array('q', [0]) * (n + 1)
+        for src in srcs:
+            offsets[src + 1] += 1
+        for v in range(n):
+            offsets[v + 1] += offsets[v]
+        fill = array('q', offsets[:n])
+        targets = array('q', [0]) * m
+        kept = [0] * m if isinstance(weights, list) else array('q', [0]) * m
+        for i, src in enumerate(srcs):
+            targets[fill[src]] = dsts[i]
+            kept[fill[src]] = weights[i]
+            fill[src] += 1
+        del srcs[:], dsts[:], weights[:], fill
+
+        # rows are now in input order, sort each by dst and compact them in place towards the front
+        end = 0
+        for v in range(n):
+            lo, hi = offsets[v], offsets[v + 1]
+            offsets[v] = end
+            row_targets, row_weights = targets[lo:hi], kept[lo:hi]
+            order = sorted(range(hi - lo), key=row_targets.__getitem__)
+            for k, i in enumerate(order):
+                # equal dsts stay in input order, so only the last of a run is kept
+                if k + 1 < len(order) and row_targets[order[k + 1]] == row_targets[i]:
+                    continue
+                if row_weights[i] > 0:
+                    targets[end] = row_targets[i]
+                    kept[end] = row_weights[i]
+                    end += 1
+        offsets[n] = end
+        del targets[end:], kept[end:]
+        self._offsets, self._targets, self._weights = offsets, targets, kept
+        self._edge_count = end
+        self._reverse = None
+        self._version += 1
+
+    def _build_csr(self) -> None:
+        """
+        Build the CSR arrays from buffered edits when there are no stored edges yet (bulk loads)
+        Edges are sorted by the single int key src * V + dst, which is much faster than sorting pairs
+        """
+        n = self.v_count
+        edges = sorted(((src * n + dst, weight) for (src, dst), weight in self._pending.items() if weight > 0),
+                       key=itemgetter(0))
+        self._pending = {}
+        offsets = array('q', [0]) * (n + 1)
+        targets = array('q', [0]) * len(edges)
+        for pos, (key, _) in enumerate(edges):
+            src, targets[pos] = divmod(key, n)
+            offsets[src + 1] += 1
+        for v in range(n):
+            offsets[v + 1] += offsets[v]
+        weights = [weight for _, weight in edges]
+        self._offsets, self._targets = offsets, targets
+        self._weights = array('q', weights) if all(isinstance(w, int) for w in weights) else weights
+        self._reverse = None
+
+
+class GraphSnapshot(SparseDirectedGraph):
+    """
+    Read-only SparseDirectedGraph over frozen CSR arrays, returned by snapshot()
+    - nothing changes it after it is made, so any number of threads can query it at once without locks
+    - version is the edit version of the graph it was taken from
+    - edit methods raise TypeError, derived graphs such as condensation() are SparseDirectedGraphs
+    """
+
+    version = 0
+    _result_class = SparseDirectedGraph
+
+    @classmethod
+    def freeze(cls, offsets, targets, weights, version: int) -> 'GraphSnapshot':
+        """
+        Return snapshot over read-only views of the given CSR arrays, with its own copy of a weight list
+        """
+        weights = list(weights) if isinstance(weights, list) else _read_only(weights)
+        snapshot = cls._from_csr(_read_only(offsets), _read_only(targets), weights)
+        snapshot.version = version
+        return snapshot
+
+    def add_vertex(self) -> int:
+        raise TypeError('graph snapshots are read-only')
+
+    def add_edge(self, src: int, dst: int, weight=1) -> None:
+        raise TypeError('graph snapshots are read-only')
+
+    def remove_edge(self, src: int, dst: int) -> None:
+        raise TypeError('graph snapshots are read-only')
+
+    def _allocate(self, n_vertices: int) -> None:
+        raise TypeError('graph snapshots are read-only')
+
+    def _write_edges(self, batch: dict) -> None:
+        raise TypeError('graph snapshots are read-only')
+
+    def _load_edges(self, srcs: array, dsts: array, weights) -> None:
+        raise TypeError('graph snapshots are read-only')
+
+
+def _read_only(values) -> memoryview:
+    """
+    Return read-only memoryview over an array (or the view itself if it already is one)
+    """
+    if isinstance(values, memoryview) and values.readonly:
+        return values
+    return memoryview(values).toreadonly()
+
+
+def _walk_back(pred, src: int, dst: int) -> []:
+    """
+    Return list of vertices on the path src -> dst, following pred[] links back from dst
+    """
+    path = [dst]
+    while path[-1] != src:
+        path.append(int(pred[path[-1]]))
+    path.reverse()
+    return path
+
+
+class _CSRMatrixView:
+    """
+    Read-only adjacency matrix view of a SparseDirectedGraph, rows are built on demand
+    Rows are tuples, so writing to one raises TypeError instead of being lost
+    """
+
+    def __init__(self, graph: SparseDirectedGraph):
+        self._graph = graph
+
+    def __len__(self) -> int:
+        return self._graph.v_count
+
+    def __getitem__(self, v: int) -> tuple:
+        if v < 0:
+            v += self._graph.v_count
+        if v < 0 or v >= self._graph.v_count:
+            raise IndexError('vertex index out of range')
+        row = [0] * self._graph.v_count
+        for dst, weight in self._graph._neighbors(v):
+            row[dst] = weight
+        return tuple(row)
+
+    def __iter__(self):
+        for v in range(self._graph.v_count):
+            yield self[v]
 
 
 if __name__ == '__main__':
@@ -324,3 +1521,198 @@ if __name__ == '__main__':
     print('\n', g)
     for i in range(5):
         print(f'DIJKSTRA {i} {g.dijkstra(i)}')
+
+
+    print("\nSparseDirectedGraph - same results as DirectedGraph")
+    print("---------------------------------------------------")
+    edges = [(0, 1, 10), (4, 0, 12), (1, 4, 15), (4, 3, 3),
+             (3, 1, 5), (2, 1, 23), (3, 2, 7)]
+    g, sg = DirectedGraph(edges), SparseDirectedGraph(edges)
+    print(str(g) == str(sg), g.get_edges() == sg.get_edges())
+    for i in range(5):
+        print(f'{i} DFS:{sg.dfs(i)} BFS:{sg.bfs(i)} DIJKSTRA:{sg.dijkstra(i)}')
+
+
+    print("\nhas_cycle() witness example")
+    print("---------------------------")
+    edges = [(0, 1, 10), (4, 0, 12), (1, 4, 15), (4, 3, 3),
+             (3, 1, 5), (2, 1, 23), (3, 2, 7)]
+    g = DirectedGraph(edges)
+    print(g.has_cycle(witness=True))
+    for src, dst in [(1, 4), (2, 1)]:
+        g.remove_edge(src, dst)
+    print(g.has_cycle(witness=True))
+
+
+    print("\niter_dfs() / iter_bfs() example")
+    print("-------------------------------")
+    edges = [(0, 1, 10), (4, 0, 12), (1, 4, 15), (4, 3, 3),
+             (3, 1, 5), (2, 1, 23), (3, 2, 7)]
+    g = DirectedGraph(edges)
+    print(list(g.iter_bfs(0, info=True)))
+    print(list(g.iter_dfs(0, stop=lambda v: v == 3)))
+
+
+    print("\nall_pairs_shortest_paths() example")
+    print("----------------------------------")
+    edges = [(0, 1, 10), (4, 0, 12), (1, 4, 15), (4, 3, 3),
+             (3, 1, 5), (2, 1, 23), (3, 2, 7)]
+    g = DirectedGraph(edges)
+    dist, pred = g.all_pairs_shortest_paths(predecessors=True)
+    for i in range(5):
+        print(f'APSP {i} {[int(d) for d in dist[i]]} path to 2: {g.reconstruct_path(pred, i, 2)}')
+
+
+    print("\nshortest_path() / bidirectional / A* example")
+    print("--------------------------------------------")
+    edges = [(0, 1, 10), (4, 0, 12), (1, 4, 15), (4, 3, 3),
+             (3, 1, 5), (2, 1, 23), (3, 2, 7)]
+    g = DirectedGraph(edges)
+    print(g.shortest_path(0, 2), g.bidirectional_shortest_path(0, 2), g.astar_path(0, 2, lambda v: 0))
+    g.remove_edge(1, 4)
+    print(g.shortest_path(0, 2))
+
+
+    print("\nfrom_edges() / add_edges() / remove_edges() example")
+    print("---------------------------------------------------")
+    edges = [(0, 1, 10), (4, 0, 12), (1, 4, 15), (4, 3, 3),
+             (3, 1, 5), (2, 1, 23), (3, 2, 7)]
+    g = SparseDirectedGraph.from_edges(edges)
+    g.remove_edges([(3, 1), (4, 0), (9, 9)])
+    g.add_edges([(0, 2, 4), (0, 2, 6), (1, 1, 1)])
+    print(g.get_edges() == DirectedGraph.from_edges(g.get_edges(), 5).get_edges(), g.get_edges())
+
+
+    print("\nsave() / load() example")
+    print("-----------------------")
+    import os
+    import tempfile
+    edges = [(0, 1, 10), (4, 0, 12), (1, 4, 15), (4, 3, 3),
+             (3, 1, 5), (2, 1, 23), (3, 2, 7)]
+    path = os.path.join(tempfile.mkdtemp(), 'graph.bin')
+    DirectedGraph(edges).save(path)
+    g = SparseDirectedGraph.load(path)
+    print(sorted(g.get_edges()) == sorted(edges), g.dijkstra(0))
+
+
+    print("\ntopological_order() / dag_shortest_paths() / dag_longest_paths() example")
+    print("--------------------------------------------------------------------------")
+    edges = [(0, 1, 10), (0, 2, 4), (2, 1, 3), (1, 3, 2), (2, 3, 9), (3, 4, 1)]
+    g = DirectedGraph(edges)
+    print(g.topological_order(), g.dag_shortest_paths(0), g.dag_longest_paths(0))
+    g.add_edge(4, 0, 1)
+    print(g.topological_order(), g.dag_shortest_paths(0))
+
+
+    print("\nstrongly_connected_components() / condensation() example")
+    print("---------------------------------------------------------")
+    edges = [(0, 1, 10), (4, 0, 12), (1, 4, 15), (4, 3, 3),
+             (3, 1, 5), (2, 1, 23), (3, 2, 7), (5, 6, 2)]
+    g = DirectedGraph(edges)
+    print(list(g.strongly_connected_components(reuse=True)), g.condensation(reuse=True).get_edges())
+    g.remove_edge(3, 2)
+    print(list(g.strongly_connected_components(reuse=True)), g.condensation(reuse=True).get_edges())
+
+
+    print("\nenable_cache() example")
+    print("----------------------")
+    edges = [(0, 1, 10), (4, 0, 12), (1, 4, 15), (4, 3, 3),
+             (3, 1, 5), (2, 1, 23), (3, 2, 7)]
+    g = DirectedGraph(edges)
+    g.enable_cache()
+    print(g.dijkstra(0), g.dijkstra(0), g.bfs(0))
+    g.remove_edge(4, 3)
+    print(g.dijkstra(0), g.cache_stats())
+
+
+    print("\nreachable() example")
+    print("-------------------")
+    edges = [(0, 1, 10), (4, 0, 12), (1, 4, 15), (4, 3, 3),
+             (3, 1, 5), (2, 1, 23), (3, 2, 7), (5, 6, 2)]
+    g = SparseDirectedGraph(edges)
+    print([g.reachable(0, v) for v in range(7)], g.reachable(5, 6), g.reachable(6, 5))
+    g.remove_edge(4, 3)
+    print([g.reachable(0, v) for v in range(7)])
+
+
+    print("\nenable_instrumentation() example")
+    print("--------------------------------")
+    edges = [(0, 1, 10), (4, 0, 12), (1, 4, 15), (4, 3, 3),
+             (3, 1, 5), (2, 1, 23), (3, 2, 7)]
+    g = DirectedGraph(edges)
+    g.enable_instrumentation()
+    g.dijkstra(0)
+    g.remove_edge(4, 3)
+    g.dijkstra(0)
+    for op, stats in g.instrumentation_stats().items():
+        print(op, {k: stats[k] for k in ('calls', 'vertices', 'edges', 'heap_pushes', 'heap_pops')})
+    g.disable_instrumentation()
+
+
+    print("\nminimum_spanning_forest() example")
+    print("---------------------------------")
+    edges = [(0, 1, 10), (4, 0, 12), (1, 4, 15), (4, 3, 3),
+             (3, 1, 5), (2, 1, 23), (3, 2, 7), (5, 6, 2)]
+    g = SparseDirectedGraph(edges)
+    print(g.minimum_spanning_forest(), g.minimum_spanning_forest('prim')[0])
+
+
+    print("\nsnapshot() example")
+    print("------------------")
+    edges = [(0, 1, 10), (4, 0, 12), (1, 4, 15), (4, 3, 3),
+             (3, 1, 5), (2, 1, 23), (3, 2, 7)]
+    g = SparseDirectedGraph(edges)
+    s = g.snapshot()
+    g.remove_edge(4, 3)
+    g.add_vertex()
+    print(s.version, s.v_count, s.dijkstra(0), g.v_count, g.dijkstra(0))
+    try:
+        s.add_edge(0, 2)
+    except TypeError as error:
+        print(error)
+
+
+    print("\nabfs() / adfs() / adijkstra() example")
+    print("-------------------------------------")
+    import asyncio
+    edges = [(0, 1, 10), (4, 0, 12), (1, 4, 15), (4, 3, 3),
+             (3, 1, 5), (2, 1, 23), (3, 2, 7)]
+    g = SparseDirectedGraph(edges)
+    print(asyncio.run(g.abfs(0, every=2)), asyncio.run(g.adfs(0, offload=True)), asyncio.run(g.adijkstra(0)))
+
+
+    print("\nConcurrentGraph publish() / batch() example")
+    print("-------------------------------------------")
+    import threading
+    from concurrent_graph import ConcurrentGraph
+    edges = [(0, 1, 10), (4, 0, 12), (1, 4, 15), (4, 3, 3),
+             (3, 1, 5), (2, 1, 23), (3, 2, 7)]
+    cg = ConcurrentGraph(SparseDirectedGraph(edges))
+    before = cg.snapshot()
+    cg.remove_edge(4, 3)
+    print(cg.snapshot() is before, cg.snapshot().dijkstra(0))
+    print(cg.publish().dijkstra(0), cg.publish() is cg.snapshot())
+    with cg.batch():
+        cg.add_edge(0, 2, 1)
+        cg.add_edges([(2, 3, 1), (3, 4, 1)])
+    results = []
+    readers = [threading.Thread(target=lambda: results.append(cg.snapshot().dijkstra(0))) for _ in range(3)]
+    for reader in readers:
+        reader.start()
+    for reader in readers:
+        reader.join()
+    print(results, before.dijkstra(0))
+
+
+    print("\nShardedGraph build() / open() / report() example")
+    print("------------------------------------------------")
+    from sharded_graph import ShardedGraph
+    # two rings of 6 vertices joined by one edge
+    edges = [(v, (v + 1) % 6, 1) for v in range(6)] + [(6 + v, 6 + (v + 1) % 6, 2) for v in range(6)] + [(5, 6, 4)]
+    directory = os.path.join(tempfile.mkdtemp(), 'shards')
+    sg = ShardedGraph.build(iter(edges), 12, directory, shards=2, partition='label_propagation', cache_shards=1)
+    print(sg.num_edges(), sg.dijkstra(0), sg.bfs(0, 7))
+    report = sg.report()
+    print({k: report[k] for k in ('shard_vertices', 'boundary_edges', 'cross_shard_ratio', 'shard_loads')})
+    sg = ShardedGraph.open(directory)
+    print(sg.count_connected_components(), list(sg.boundary_edges()), sg.report()['shard_loads'])
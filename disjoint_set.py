@@ -0,0 +1,90 @@
+# Course: CS261 - Data Structures
+# Author: Alexandra Fren
+# Description: Disjoint set (union-find) with union by size and path halving, shared by the graph classes for cycle
+# checks and connected components. Elements can be any hashable value, e.g. the interned integer vertex ids of
+# UndirectedGraph
+
+
+class DisjointSet:
+    """
+    Class to implement disjoint set forest
+    - find() and union() run in near-constant amortized time
+    - count is the current number of disjoint sets
+    - with track_members=True every root also keeps the list of its elements, so a whole set can be
+      discarded in time proportional to its size
+    """
+
+    def __init__(self, elements=None, track_members=False):
+        """
+        Store each element's parent and the size of every root's set
+        """
+        self.parent = dict()
+        self.size = dict()
+        self.members = dict() if track_members else None
+        self.count = 0
+        if elements is not None:
+            for x in elements:
+                self.add(x)
+
+    def __contains__(self, x) -> bool:
+        return x in self.parent
+
+    def __len__(self) -> int:
+        return len(self.parent)
+
+    def add(self, x) -> None:
+        """
+        Add x as a new singleton set if not already present
+        """
+        if x not in self.parent:
+            self.parent[x] = x
+            self.size[x] = 1
+            if self.members is not None:
+                self.members[x] = [x]
+            self.count += 1
+
+    def find(self, x):
+        """
+        Return the representative of the set containing x
+        """
+        parent = self.parent
+        while parent[x] != x:
+            # path halving: point every other node on the path at its grandparent
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, x, y) -> bool:
+        """
+        Merge the sets containing x and y, return False if they were already the same set
+        """
+        x, y = self.find(x), self.find(y)
+        if x == y:
+            return False
+        if self.size[x] < self.size[y]:
+            x, y = y, x
+        self.parent[y] = x
+        self.size[x] += self.size.pop(y)
+        if self.members is not None:
+            # smaller list into larger, so each element is moved O(log n) times overall
+            self.members[x].extend(self.members.pop(y))
+        self.count -= 1
+        return True
+
+    def connected(self, x, y) -> bool:
+        """
+        Return True if x and y are in the same set
+        """
+        return self.find(x) == self.find(y)
+
+    def discard_set(self, x) -> []:
+        """
+        Remove the whole set containing x and return its elements (requires track_members)
+        """
+        root = self.find(x)
+        elements = self.members.pop(root)
+        del self.size[root]
+        for i in elements:
+            del self.parent[i]
+        self.count -= 1
+        return elements
@@ -0,0 +1,231 @@
+# Course: CS261 - Data Structures
+# Author: Alexandra Fren
+# Description: Reading and writing graphs as compact binary files. A file holds a fixed header followed by the graph in
+# compressed sparse row (CSR) form: int64 offsets, int64 targets, optional int64/float64 weights and, for undirected
+# graphs, a UTF-8 vertex name table. Files are memory-mapped on load, so processes reading the same file share pages,
+# and are written to a temporary file that then replaces the old one, so a mapped file is never truncated under its
+# readers. Also streams edge lists in CSV, TSV or whitespace separated text, optionally gzip compressed, in bounded
+# memory
+
+from array import array
+from collections import namedtuple
+import csv
+import gzip
+import mmap as _mmap
+import os
+import struct
+import threading
+
+MAGIC = b'DSGRAPH\0'
+VERSION = 1
+# magic, version, directed flag, weight code, name table flag, vertex count, edge count, name blob size
+_HEADER = struct.Struct('<8sIIIIQQQ')
+HEADER_SIZE = 64
+
+NO_WEIGHTS, INT_WEIGHTS, FLOAT_WEIGHTS, MIXED_WEIGHTS = 0, 1, 2, 3
+# mixed int and float weights are stored as float64 plus one byte per edge marking the ints, so ints stay exact
+# up to this magnitude
+EXACT_INT_LIMIT = 1 << 53
+
+CSRFile = namedtuple('CSRFile', 'directed offsets targets weights names')
+
+# edges per chunk handed out by read_edge_chunks(), and the text I/O buffer size
+CHUNK_SIZE = 65536
+BUFFER_SIZE = 1 << 20
+
+
+def write_csr(path, directed: bool, offsets, targets, weights=None, names=None) -> None:
+    """
+    Write a CSR graph to path
+    - offsets has V + 1 entries, targets (and weights, if given) have E entries
+    - weights are stored as int64 if they are all ints, as float64 if none is, else as float64 with the ints marked,
+      so they come back as ints (ValueError if such an int is above EXACT_INT_LIMIT)
+    - names, if given, is the list of V vertex names (strings)
+    - path is replaced in one step at the end, a process that has the old file memory-mapped keeps reading it
+    """
+    n = len(offsets) - 1
+    m = len(targets)
+    int_mask = None
+    if weights is None:
+        code, weight_array = NO_WEIGHTS, None
+    elif all(isinstance(w, int) for w in weights):
+        code, weight_array = INT_WEIGHTS, array('q', weights)
+    elif not any(isinstance(w, int) for w in weights):
+        code, weight_array = FLOAT_WEIGHTS, array('d', weights)
+    else:
+        if any(isinstance(w, int) and abs(w) > EXACT_INT_LIMIT for w in weights):
+            raise ValueError('int weights mixed with float weights must not exceed EXACT_INT_LIMIT')
+        int_mask = bytearray(isinstance(w, int) for w in weights)
+        code, weight_array = MIXED_WEIGHTS, array('d', weights)
+        # keep the sections after it 8-byte aligned
+        int_mask.extend(bytes(-m % 8))
+    name_offsets, blob = None, b''
+    if names is not None:
+        encoded = [name.encode('utf-8') for name in names]
+        name_offsets = array('q', [0])
+        for name in encoded:
+            name_offsets.append(name_offsets[-1] + len(name))
+        blob = b''.join(encoded)
+
+    # truncating path in place would pull the pages from under anyone who has it memory-mapped (SIGBUS)
+    path = os.fspath(path)
+    temp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    f = open(temp, 'xb')
+    try:
+        with f:
+            header = _HEADER.pack(MAGIC, VERSION, int(directed), code, int(names is not None), n, m, len(blob))
+            f.write(header.ljust(HEADER_SIZE, b'\0'))
+            f.write(_as_int64(offsets).tobytes())
+            f.write(_as_int64(targets).tobytes())
+            if weight_array is not None:
+                f.write(weight_array.tobytes())
+            if int_mask is not None:
+                f.write(int_mask)
+            if name_offsets is not None:
+                f.write(name_offsets.tobytes())
+                f.write(blob)
+        os.replace(temp, path)
+    except BaseException:
+        os.remove(temp)
+        raise
+
+
+def read_csr(path, mmap=True) -> CSRFile:
+    """
+    Read a file written by write_csr()
+    With mmap=True the arrays are read-only memoryviews over a shared memory map of the file,
+    otherwise they are arrays copied into memory; mixed int and float weights are always returned as a list
+    """
+    with open(path, 'rb') as f:
+        if mmap:
+            buf = memoryview(_mmap.mmap(f.fileno(), 0, access=_mmap.ACCESS_READ))
+        else:
+            buf = memoryview(f.read())
+    if len(buf) < HEADER_SIZE:
+        raise ValueError(f'{path} is not a graph file')
+    magic, version, directed, code, has_names, n, m, blob_size = _HEADER.unpack_from(buf)
+    if magic != MAGIC:
+        raise ValueError(f'{path} is not a graph file')
+    if version != VERSION:
+        raise ValueError(f'{path} has unsupported graph file version {version}')
+
+    pos = HEADER_SIZE
+
+    def section(fmt: str, count: int):
+        nonlocal pos
+        view = buf[pos:pos + 8 * count].cast(fmt)
+        pos += 8 * count
+        return view if mmap else array(fmt, view)
+
+    offsets = section('q', n + 1)
+    targets = section('q', m)
+    weights = None
+    if code == INT_WEIGHTS:
+        weights = section('q', m)
+    elif code == FLOAT_WEIGHTS:
+        weights = section('d', m)
+    elif code == MIXED_WEIGHTS:
+        values = buf[pos:pos + 8 * m].cast('d')
+        mask = buf[pos + 8 * m:pos + 9 * m]
+        weights = [int(w) if is_int else w for w, is_int in zip(values, mask)]
+        pos += 8 * m + m + (-m % 8)
+    names = None
+    if has_names:
+        name_offsets = buf[pos:pos + 8 * (n + 1)].cast('q')
+        blob = bytes(buf[pos + 8 * (n + 1):pos + 8 * (n + 1) + blob_size])
+        names = [blob[name_offsets[i]:name_offsets[i + 1]].decode('utf-8') for i in range(n)]
+    return CSRFile(bool(directed), offsets, targets, weights, names)
+
+
+def _as_int64(values) -> array:
+    """
+    Return values as an int64 array, without copying if it already is one
+    """
+    if isinstance(values, array) and values.typecode == 'q':
+        return values
+    return array('q', values)
+
+
+def read_edge_chunks(path, fmt=None, weighted=True, chunk_size=CHUNK_SIZE, skip_header=False):
+    """
+    Yield lists of at most chunk_size edges read from an edge list text file
+    - fmt is 'csv', 'tsv' or 'edgelist' (whitespace separated), by default picked from the file extension
+    - files ending in .gz are decompressed on the fly
+    - weighted=True yields (int, int, weight) with weight 1 for rows that have none,
+      weighted=False yields (name, name) pairs and ignores extra columns
+    - blank lines and lines starting with # are skipped
+    """
+    fmt = fmt or _format_of(path)
+    with _open_text(path, 'r') as f:
+        if fmt == 'edgelist':
+            rows = (line.split() for line in f)
+        else:
+            rows = csv.reader(f, delimiter=',' if fmt == 'csv' else '\t')
+        if skip_header:
+            next(rows, None)
+        chunk = []
+        for row in rows:
+            if not row or row[0].startswith('#'):
+                continue
+            if weighted:
+                chunk.append((int(row[0]), int(row[1]), _number(row[2]) if len(row) > 2 else 1))
+            else:
+                chunk.append((row[0], row[1]))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def write_edge_list(path, edges, fmt=None) -> int:
+    """
+    Write an iterable of edge tuples to a text file one row at a time, return number of edges written
+    fmt and .gz handling are the same as read_edge_chunks()
+    """
+    fmt = fmt or _format_of(path)
+    count = 0
+    with _open_text(path, 'w') as f:
+        if fmt == 'edgelist':
+            for edge in edges:
+                f.write(' '.join(map(str, edge)) + '\n')
+                count += 1
+        else:
+            writer = csv.writer(f, delimiter=',' if fmt == 'csv' else '\t', lineterminator='\n')
+            for edge in edges:
+                writer.writerow(edge)
+                count += 1
+    return count
+
+
+def _format_of(path) -> str:
+    """
+    Return edge list format implied by the file name
+    """
+    name = str(path).lower()
+    if name.endswith('.gz'):
+        name = name[:-3]
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith('.tsv'):
+        return 'tsv'
+    return 'edgelist'
+
+
+def _open_text(path, mode: str):
+    """
+    Open a (possibly gzip compressed) text file with a large buffer
+    """
+    if str(path).endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8', newline='')
+    return open(path, mode, buffering=BUFFER_SIZE, encoding='utf-8', newline='')
+
+
+def _number(text: str):
+    """
+    Return text as an int if it is one, else as a float
+    """
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
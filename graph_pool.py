@@ -0,0 +1,94 @@
+# Course: CS261 - Data Structures
+# Author: Alexandra Fren
+# Description: Runs a per-source graph algorithm (dijkstra, bfs, ...) for many sources on a pool of worker processes.
+# The graph is written once to a temporary graph_io file and every worker loads it when it starts, so the graph is never
+# pickled per task. Directed graphs use the memory-mapped arrays and share their pages across workers; an
+# UndirectedGraph rebuilds its adjacency dicts on load, so each worker holds its own copy. Sources are handed out in
+# chunks and results come back in source order; with one worker, or if no process pool can be started, everything runs
+# in this process. Errors of the algorithm in a worker, and workers that die once the pool is running, are raised to the
+# caller
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import os
+import tempfile
+
+# each worker gets about this many chunks, so slow chunks can be balanced out
+CHUNKS_PER_WORKER = 4
+
+# graph and algorithm of a worker process, set once by _init_worker()
+_graph = None
+_algorithm = None
+
+
+def map_sources(graph, algorithm, sources, workers=None, chunk_size=None, loader=None) -> []:
+    """
+    Return [algorithm(graph, s) for s in sources], computed on worker processes
+    - algorithm is a method name such as 'dijkstra' or 'bfs', or a picklable function (graph, source)
+    - workers defaults to the number of CPUs, chunk_size to about CHUNKS_PER_WORKER chunks per worker
+    - loader(path) loads the graph in a worker, by default type(graph).load
+    """
+    sources = list(sources)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(sources))
+    if workers <= 1:
+        return _run_serial(graph, algorithm, sources)
+    if chunk_size is None:
+        chunk_size = max(1, len(sources) // (workers * CHUNKS_PER_WORKER))
+    if loader is None:
+        loader = type(graph).load
+
+    fd, path = tempfile.mkstemp(suffix='.graph')
+    os.close(fd)
+    try:
+        graph.save(path)
+        pool = None
+        try:
+            pool = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(loader, path, algorithm))
+            # start a worker and load the graph in it, so only a pool that cannot start at all falls back
+            pool.submit(_ready).result()
+        except (BrokenProcessPool, OSError, NotImplementedError):
+            # no usable process pool here (sandbox, missing semaphores, ...)
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+            return _run_serial(graph, algorithm, sources)
+        # errors raised by the algorithm, or a worker dying mid-run, propagate instead of rerunning everything here
+        with pool:
+            return list(pool.map(_run_one, sources, chunksize=chunk_size))
+    finally:
+        os.remove(path)
+
+
+def _run_serial(graph, algorithm, sources: []) -> []:
+    """
+    Return results of algorithm for every source, computed in this process
+    """
+    if isinstance(algorithm, str):
+        method = getattr(graph, algorithm)
+        return [method(s) for s in sources]
+    return [algorithm(graph, s) for s in sources]
+
+
+def _init_worker(loader, path, algorithm) -> None:
+    """
+    Load the shared graph file once per worker process
+    """
+    global _graph, _algorithm
+    _graph = loader(path)
+    _algorithm = algorithm
+
+
+def _ready() -> None:
+    """
+    Do nothing, run once to check that a worker process starts and loads the graph
+    """
+
+
+def _run_one(source):
+    """
+    Run the worker's algorithm for one source
+    """
+    if isinstance(_algorithm, str):
+        return getattr(_graph, _algorithm)(source)
+    return _algorithm(_graph, source)
@@ -0,0 +1,196 @@
+# Course: CS261 - Data Structures
+# Author: Alexandra Fren
+# Description: Opt-in per-operation instrumentation for the graph classes. enable() shadows the traversal, search and
+# edit methods of one graph object with timing wrappers that record call counts, a latency histogram, the vertices
+# and edges each call touched and the heap pushes and pops of dijkstra, and pass every call to an optional callback
+# for an external metrics sink. disable() removes the wrappers again, so a graph that is not instrumented runs the
+# plain class methods and pays nothing
+
+import threading
+import time
+
+# queries whose touched vertices and edges are worked out from their result
+QUERIES = ('dfs', 'bfs', 'dijkstra', 'has_cycle', 'count_connected_components')
+MUTATORS = ('add_vertex', 'add_edge', 'remove_edge', 'remove_vertex', 'add_edges', 'remove_edges')
+# traversals count the edges of the rows they read, through the first of these row methods the graph has
+TRAVERSALS = ('dfs', 'bfs', 'dijkstra')
+ROW_METHODS = ('_row', '_sorted_neighbors', '_neighbors')
+# latency buckets are powers of two microseconds, the last one also holds everything slower
+BUCKETS = 32
+
+
+class Instrumentation:
+    """
+    Class to implement the statistics of one instrumented graph
+    - stats maps operation name -> dict of calls, seconds, vertices, edges, heap_pushes, heap_pops and histogram
+    - histogram[i] counts calls that took less than 2^i microseconds (and at least 2^(i-1))
+    - callback(event) is called after every call with a dict of op and that call's numbers
+    """
+
+    def __init__(self, callback=None):
+        """
+        Start with no recorded calls
+        """
+        self.callback = callback
+        self.stats = dict()
+
+    def record(self, op: str, seconds: float, vertices: int, edges: int, pushes=0, pops=0) -> None:
+        """
+        Add one call of op to the statistics and pass it on to the callback
+        """
+        entry = self.stats.get(op)
+        if entry is None:
+            entry = self.stats[op] = {'calls': 0, 'seconds': 0.0, 'vertices': 0, 'edges': 0,
+                                      'heap_pushes': 0, 'heap_pops': 0, 'histogram': [0] * BUCKETS}
+        entry['calls'] += 1
+        entry['seconds'] += seconds
+        entry['vertices'] += vertices
+        entry['edges'] += edges
+        entry['heap_pushes'] += pushes
+        entry['heap_pops'] += pops
+        entry['histogram'][min(BUCKETS - 1, int(seconds * 1e6).bit_length())] += 1
+        if self.callback is not None:
+            self.callback({'op': op, 'seconds': seconds, 'vertices': vertices, 'edges': edges,
+                           'heap_pushes': pushes, 'heap_pops': pops})
+
+    def report(self) -> dict:
+        """
+        Return copy of the statistics, with histograms as {upper bound in seconds: calls} of the non-empty buckets
+        """
+        out = dict()
+        for op, entry in self.stats.items():
+            out[op] = dict(entry, histogram={(1 << i) / 1e6: calls for i, calls in enumerate(entry['histogram'])
+                                             if calls})
+        return out
+
+    def reset(self) -> None:
+        """
+        Forget all recorded calls
+        """
+        self.stats.clear()
+
+
+def enable(graph, callback=None) -> Instrumentation:
+    """
+    Wrap the queries and edit methods graph has, replacing earlier instrumentation, and return its Instrumentation
+    Heap operations of dijkstra are counted by _dijkstra_from into a counter of this graph and thread only; the edges
+    of traversals are counted by also wrapping the graph's row method, which counts only during a traversal call
+    """
+    disable(graph)
+    tracker = Instrumentation(callback)
+    if hasattr(graph, '_dijkstra_from'):
+        graph._heap_counts = _CallCounts()
+    scans = _CallCounts()
+    for name in ROW_METHODS:
+        method = getattr(graph, name, None)
+        if method is not None:
+            setattr(graph, name, _count_rows(scans, name, method))
+            break
+    for name in QUERIES + MUTATORS:
+        method = getattr(graph, name, None)
+        if method is not None:
+            setattr(graph, name, _wrap(graph, tracker, name, method, scans))
+    graph._instrumentation = tracker
+    return tracker
+
+
+def disable(graph) -> None:
+    """
+    Remove the wrappers of enable(), so calls go straight to the class methods again
+    """
+    if graph.__dict__.get('_instrumentation') is None:
+        return
+    for name in QUERIES + MUTATORS + ROW_METHODS:
+        graph.__dict__.pop(name, None)
+    graph.__dict__.pop('_heap_counts', None)
+    del graph._instrumentation
+
+
+def _wrap(graph, tracker: Instrumentation, name: str, method, scans: '_CallCounts'):
+    """
+    Return function that calls method and records it in tracker under name
+    """
+    heap_counts = graph.__dict__.get('_heap_counts') if name == 'dijkstra' else None
+    traversal = name in TRAVERSALS
+
+    def call(*args, **kwargs):
+        if name in ('add_edges', 'remove_edges'):
+            args = (list(args[0]),) + args[1:] if args else args
+        before = graph.degree(args[0]) if name == 'remove_vertex' and args else 0
+        counter = scanned = None
+        if heap_counts is not None:
+            previous = heap_counts.current
+            counter = heap_counts.current = [0, 0]
+        if traversal:
+            previous_scan = scans.current
+            scanned = scans.current = [0]
+        start = time.perf_counter()
+        try:
+            result = method(*args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            if counter is not None:
+                heap_counts.current = previous
+            if traversal:
+                scans.current = previous_scan
+        vertices, edges = _touched(graph, name, args, result, before)
+        if traversal:
+            edges = scanned[0]
+        if counter is not None:
+            tracker.record(name, seconds, vertices, edges, counter[0], counter[1])
+        else:
+            tracker.record(name, seconds, vertices, edges)
+        return result
+    call.__wrapped__ = method
+    call.__name__ = name
+    return call
+
+
+def _touched(graph, name: str, args: tuple, result, before: int) -> (int, int):
+    """
+    Return (vertices, edges) a call touched: visited vertices for traversals (their edges are counted while they
+    run), the whole graph for has_cycle and count_connected_components, the edited ones for edits
+    """
+    if name in ('dfs', 'bfs'):
+        return len(result), 0
+    if name == 'dijkstra':
+        return len(result) - result.count(float('inf')), 0
+    if name in ('has_cycle', 'count_connected_components'):
+        return (graph.v_count if hasattr(graph, 'v_count') else len(graph._ids)), graph.num_edges()
+    if name == 'add_vertex':
+        return 1, 0
+    if name == 'remove_vertex':
+        return 1, before
+    if name in ('add_edges', 'remove_edges'):
+        return 0, len(args[0]) if args else 0
+    return 2, 1
+
+
+def _count_rows(scans: '_CallCounts', name: str, method):
+    """
+    Return function that calls a row method and, during a traversal call on this thread, adds the row's edges
+    to that call's counter
+    """
+    def call(v):
+        scanned = scans.current
+        if scanned is None:
+            return method(v)
+        row = method(v)
+        if name == '_row':
+            scanned[0] += len(row[0])
+        else:
+            if not isinstance(row, list):
+                row = list(row)
+            scanned[0] += len(row)
+        return row
+    call.__wrapped__ = method
+    call.__name__ = name
+    return call
+
+
+class _CallCounts(threading.local):
+    """
+    Per-thread counter list of the instrumented call running on that thread, None between calls:
+    [pushes, pops] of dijkstra, or [edges] read by a traversal
+    """
+    current = None
@@ -0,0 +1,118 @@
+# Course: CS261 - Data Structures
+# Author: Alexandra Fren
+# Description: Reachability index over the condensation of a directed graph. Vertices are first mapped to their
+# strongly connected component, with component ids numbered in topological order, so "u reaches v" becomes a question
+# about the component DAG. Small DAGs keep their whole transitive closure as one bitset per component. Larger ones
+# keep two post-order interval labels per component (as in GRAIL): a component can only reach another whose
+# intervals lie inside its own, which answers most negative queries at once, and a DFS pruned by the same test
+# decides the rest
+
+from array import array
+
+# components up to which the full transitive closure is kept, it takes about CLOSURE_LIMIT^2 / 8 bytes
+CLOSURE_LIMIT = 4096
+
+
+class ReachabilityIndex:
+    """
+    Class to implement reachability queries on a graph whose strongly connected components are known
+    - comp[v] is the component id of vertex v, every edge between components goes from a lower to a higher id
+    - successors[c] lists the components c has an edge to, without duplicates
+    """
+
+    def __init__(self, comp, successors: [], closure_limit=CLOSURE_LIMIT):
+        """
+        Build the closure bitsets if there are at most closure_limit components, the interval labels otherwise
+        """
+        self.comp = comp
+        self.successors = successors
+        self.closure = None
+        self.labels = None
+        if len(successors) <= closure_limit:
+            self.closure = _closure(successors)
+        else:
+            self.labels = [_intervals(successors, False), _intervals(successors, True)]
+
+    def reachable(self, u: int, v: int) -> bool:
+        """
+        Return True if vertex u reaches vertex v (every vertex reaches itself)
+        """
+        a, b = self.comp[u], self.comp[v]
+        if a == b:
+            return True
+        if a > b:
+            return False
+        if self.closure is not None:
+            return self.closure[a] >> b & 1 == 1
+        if not self._may_reach(a, b):
+            return False
+        # DFS over the components that can still reach b, they all lie between a and b in topological order
+        seen = {a}
+        stack = [a]
+        while stack:
+            c = stack.pop()
+            for d in self.successors[c]:
+                if d == b:
+                    return True
+                if d < b and d not in seen and self._may_reach(d, b):
+                    seen.add(d)
+                    stack.append(d)
+        return False
+
+    def _may_reach(self, a: int, b: int) -> bool:
+        """
+        Return False if the interval labels prove that component a does not reach component b
+        """
+        for low, post in self.labels:
+            if low[b] < low[a] or post[b] > post[a]:
+                return False
+        return True
+
+
+def _closure(successors: []) -> []:
+    """
+    Return list of int bitsets, bit d of closure[c] is set if component c reaches component d
+    """
+    closure = [0] * len(successors)
+    # successors have higher ids, so walking the ids backwards finishes them first
+    for c in range(len(successors) - 1, -1, -1):
+        bits = 1 << c
+        for d in successors[c]:
+            bits |= closure[d]
+        closure[c] = bits
+    return closure
+
+
+def _intervals(successors: [], backwards: bool):
+    """
+    Return (low, post) arrays: post[c] is c's number in a DFS post-order, low[c] the smallest one below c
+    backwards=True starts from the last roots and children, which gives a second, different labeling
+    """
+    n = len(successors)
+    post = array('q', [-1]) * n
+    low = array('q', [0]) * n
+    counter = 0
+    roots = range(n - 1, -1, -1) if backwards else range(n)
+    for root in roots:
+        if post[root] >= 0:
+            continue
+        # -2 marks components on the DFS path, the DAG has no edges back to them
+        post[root] = -2
+        stack = [(root, iter(reversed(successors[root]) if backwards else successors[root]))]
+        while stack:
+            c, children = stack[-1]
+            for d in children:
+                if post[d] == -1:
+                    post[d] = -2
+                    stack.append((d, iter(reversed(successors[d]) if backwards else successors[d])))
+                    break
+            else:
+                stack.pop()
+                smallest = counter
+                for d in successors[c]:
+                    if low[d] < smallest:
+                        smallest = low[d]
+                low[c] = smallest
+                post[c] = counter
+                counter += 1
+    return low, post
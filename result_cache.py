@@ -0,0 +1,131 @@
+# Course: CS261 - Data Structures
+# Author: Alexandra Fren
+# Description: Opt-in cache of query results (dijkstra, bfs, ...) shared by the graph classes. Results are keyed by
+# method name and arguments and are only valid for the graph version they were computed on: every edit bumps the
+# graph's version, and the first lookup after an edit drops everything. Least recently used results are evicted to
+# stay under a byte budget, and hit/miss counts are kept for stats()
+
+from array import array
+from collections import OrderedDict
+from functools import wraps
+import sys
+
+# byte budget of a cache created without one
+DEFAULT_MAX_BYTES = 64 << 20
+
+_CONTAINERS = (list, tuple, dict, set, frozenset, array)
+
+
+class ResultCache:
+    """
+    Class to implement a least recently used cache of query results with a byte budget
+    - sizes are estimates from sys.getsizeof over the containers of a result
+    - a result bigger than the whole budget is returned but not kept
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Store results in use order, oldest first, with the graph version they belong to
+        """
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.version = None
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def lookup(self, version: int, key, compute):
+        """
+        Return a copy of the result cached under key for this graph version, calling compute() on a miss
+        """
+        if version != self.version:
+            if self.entries:
+                self.invalidations += 1
+            self.clear()
+            self.version = version
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return _copy(self.entries[key][0])
+        self.misses += 1
+        value = compute()
+        size = _size_of(value)
+        if size <= self.max_bytes:
+            self.entries[key] = (_copy(value), size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, dropped) = self.entries.popitem(last=False)
+                self.bytes -= dropped
+                self.evictions += 1
+        return value
+
+    def clear(self) -> None:
+        """
+        Drop every cached result, keeping the statistics
+        """
+        self.entries.clear()
+        self.bytes = 0
+
+    def stats(self) -> dict:
+        """
+        Return dict of hits, misses, evictions, invalidations, entries, bytes and max_bytes
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'invalidations': self.invalidations, 'entries': len(self.entries), 'bytes': self.bytes,
+                'max_bytes': self.max_bytes}
+
+
+def cached(method):
+    """
+    Decorate a graph query method so its results go through the graph's _cache when one is enabled
+    Calls with unhashable arguments are passed straight through
+    """
+    name = method.__name__
+
+    @wraps(method)
+    def lookup(self, *args, **kwargs):
+        cache = self._cache
+        if cache is None:
+            return method(self, *args, **kwargs)
+        key = (name, args, tuple(sorted(kwargs.items()))) if kwargs else (name, args)
+        try:
+            hash(key)
+        except TypeError:
+            return method(self, *args, **kwargs)
+        return cache.lookup(self._version, key, lambda: method(self, *args, **kwargs))
+    return lookup
+
+
+def _copy(value):
+    """
+    Return copy of a result deep enough that callers can change it without changing the cached one
+    """
+    if isinstance(value, list):
+        # results are lists of one kind of item, only lists of containers need copying item by item
+        if value and isinstance(value[0], _CONTAINERS):
+            return [_copy(x) for x in value]
+        return value.copy()
+    if isinstance(value, tuple):
+        return tuple(_copy(x) for x in value)
+    if isinstance(value, (dict, set, array)):
+        return value.copy()
+    return value
+
+
+def _size_of(value) -> int:
+    """
+    Return estimated number of bytes held by value and the containers inside it
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_size_of(k) + _size_of(v) for k, v in value.items())
+    elif isinstance(value, list) and value and not isinstance(value[0], _CONTAINERS):
+        size += len(value) * sys.getsizeof(value[0])
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(_size_of(x) for x in value)
+    return size
@@ -0,0 +1,570 @@
+# Course: CS261 - Data Structures
+# Author: Alexandra Fren
+# Description: Out-of-core directed graph for edge sets that do not fit in memory. build() partitions the vertices
+# into shards, by hash or by size-capped label propagation, buckets the edges by the shard of their source on disk
+# and writes one graph_io CSR file per shard plus a boundary-edge table of the edges that cross shards. A ShardedGraph
+# keeps only the per-vertex index in memory and loads shards through an LRU cache of a few shards, so dfs and dijkstra
+# (inherited from DirectedGraph through the _neighbors hook), a level-batched bfs and count_connected_components run
+# with a bounded number of shards resident. Rows are read as array slices, and bfs expands and dijkstra prefetches at
+# most about one shard of edges at a time, so a query holds little more than the cached shards. report() shows the
+# cross-shard edge ratio and the shard I/O so far
+
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+import heapq
+import json
+import math
+import os
+import struct
+
+from d_graph import DirectedGraph, SparseDirectedGraph, _CSRMatrixView
+import graph_io
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, shard edges are sorted with sorted() instead
+    np = None
+
+DEFAULT_SHARDS = 8
+# shards kept in memory at once
+DEFAULT_CACHE_SHARDS = 2
+# label propagation stops after this many rounds, or earlier once no vertex moves
+LP_ROUNDS = 5
+# a shard may grow to this fraction above an even share of the vertices during label propagation
+LP_SLACK = 0.1
+# edges buffered per shard before they are appended to its bucket file
+BUCKET_CHUNK = 65536
+
+META_FILE = 'meta.json'
+PARTITION_FILE = 'partition.bin'
+BOUNDARY_FILE = 'boundary.tsv'
+# edges of a one-shot iterator, kept while build() needs to read them more than once
+SPILL_FILE = 'edges.spill'
+
+# bucketed float weights are kept as the int64 with the same bits, so int weights stay exact next to them
+_FLOAT_BITS = struct.Struct('<d')
+_INT_BITS = struct.Struct('<q')
+
+
+class ShardedGraph(DirectedGraph):
+    """
+    Read-only directed weighted graph stored as on-disk shards
+    - same queries as DirectedGraph, vertices are ints 0 .. n - 1
+    - memory is O(V) for the vertex index and out-degrees plus at most cache_shards shards, and queries
+      read about one shard of edges beyond that at a time
+    - count_connected_components() counts weakly connected components (edges read as undirected)
+    - edit methods raise TypeError, a changed graph is built again with build()
+    - derived graphs such as condensation() are SparseDirectedGraphs held in memory
+    """
+
+    _result_class = SparseDirectedGraph
+
+    def __init__(self, start_edges=None):
+        """
+        Empty graph without shards, use build() or open() to get one backed by a shard directory
+        """
+        self._directory = None
+        self._shard_of = array('i')
+        self._local = array('q')
+        self._degree = array('q')
+        self._members = []
+        self._meta = dict()
+        self._resident = OrderedDict()
+        self.cache_shards = DEFAULT_CACHE_SHARDS
+        self.reset_io_stats()
+        super().__init__(start_edges)
+        self.adj_matrix = _CSRMatrixView(self)
+
+    @classmethod
+    def build(cls, edges, n_vertices: int, directory, shards=DEFAULT_SHARDS, partition='hash',
+              cache_shards=DEFAULT_CACHE_SHARDS, rounds=LP_ROUNDS) -> 'ShardedGraph':
+        """
+        Write a sharded graph of n_vertices vertices to directory and return it opened
+        - edges is a path of an edge list file (see graph_io.read_edge_chunks), a list or iterator of
+          (src, dst, weight) edges or a function returning a fresh iterable of them
+        - label propagation reads the edges once per round, an iterator is first written to an edge list file
+          in directory and read back from there
+        - invalid edges are skipped and later duplicates replace earlier ones, as with add_edges()
+        - partition is 'hash' or 'label_propagation'
+        """
+        if partition not in ('hash', 'label_propagation'):
+            raise ValueError(f'unknown partition {partition!r}')
+        os.makedirs(directory, exist_ok=True)
+        spill = os.path.join(directory, SPILL_FILE) if partition == 'label_propagation' else None
+        source = _edge_source(edges, spill)
+        if partition == 'hash':
+            shard_of = hash_partition(n_vertices, shards)
+        else:
+            shard_of = label_propagation(source, n_vertices, shards, rounds)
+        local, members = _index(shard_of, shards)
+
+        # bucket edges by source shard, keyed local source * V + destination so a sort orders them as CSR rows;
+        # weights are int64 values, or float bits where floats[i] is 1
+        n = n_vertices
+        buffers = [(array('q'), array('q'), bytearray()) for _ in range(shards)]
+        for src, dst, weight in source():
+            if 0 <= src < n and 0 <= dst < n and src != dst and weight >= 0:
+                s = shard_of[src]
+                keys, weights, floats = buffers[s]
+                keys.append(local[src] * n + dst)
+                if isinstance(weight, int):
+                    weights.append(weight)
+                    floats.append(0)
+                else:
+                    weights.append(_INT_BITS.unpack(_FLOAT_BITS.pack(weight))[0])
+                    floats.append(1)
+                if len(keys) >= BUCKET_CHUNK:
+                    _spill(directory, s, keys, weights, floats)
+        for s, (keys, weights, floats) in enumerate(buffers):
+            _spill(directory, s, keys, weights, floats)
+        if spill is not None and os.path.exists(spill):
+            os.remove(spill)
+
+        shard_edges = []
+        for s in range(shards):
+            shard_edges.append(_write_shard(directory, s, len(members[s]), n, *_read_bucket(directory, s)))
+
+        with open(os.path.join(directory, PARTITION_FILE), 'wb') as f:
+            shard_of.tofile(f)
+        meta = {'vertices': n, 'edges': sum(shard_edges), 'shards': shards, 'partition': partition,
+                'shard_edges': shard_edges, 'boundary_edges': 0}
+        _write_meta(directory, meta)
+        graph = cls.open(directory, cache_shards)
+        boundary = graph_io.write_edge_list(os.path.join(directory, BOUNDARY_FILE), graph._cross_edges())
+        graph._meta['boundary_edges'] = boundary
+        _write_meta(directory, graph._meta)
+        graph.reset_io_stats()
+        return graph
+
+    @classmethod
+    def open(cls, directory, cache_shards=DEFAULT_CACHE_SHARDS) -> 'ShardedGraph':
+        """
+        Return graph over a shard directory written by build(), with no shard loaded yet
+        Only the row offsets of every shard are read, through a memory map, to get the out-degrees
+        """
+        graph = cls()
+        with open(os.path.join(directory, META_FILE)) as f:
+            graph._meta = json.load(f)
+        graph._directory = directory
+        graph.cache_shards = cache_shards
+        graph.v_count = graph._meta['vertices']
+        with open(os.path.join(directory, PARTITION_FILE), 'rb') as f:
+            graph._shard_of.fromfile(f, graph.v_count)
+        graph._local, graph._members = _index(graph._shard_of, graph._meta['shards'])
+        graph._degree = array('q', [0]) * graph.v_count
+        for s, members in enumerate(graph._members):
+            offsets = graph_io.read_csr(_shard_path(directory, s)).offsets
+            for i, v in enumerate(members):
+                graph._degree[v] = offsets[i + 1] - offsets[i]
+            offsets.release()
+        return graph
+
+    def boundary_edges(self):
+        """
+        Yield the (src, dst, weight) edges whose ends are in different shards, read from the boundary-edge table
+        """
+        path = os.path.join(self._directory, BOUNDARY_FILE)
+        for chunk in graph_io.read_edge_chunks(path):
+            yield from chunk
+
+    def report(self) -> dict:
+        """
+        Return dict describing the partition (shard sizes, boundary edges, cross-shard edge ratio)
+        and the shard cache I/O since the last reset_io_stats()
+        """
+        meta = self._meta
+        return {'vertices': self.v_count, 'edges': meta.get('edges', 0), 'shards': meta.get('shards', 0),
+                'partition': meta.get('partition'), 'shard_vertices': [len(m) for m in self._members],
+                'shard_edges': meta.get('shard_edges', []), 'boundary_edges': meta.get('boundary_edges', 0),
+                'cross_shard_ratio': meta['boundary_edges'] / meta['edges'] if meta.get('edges') else 0.0,
+                'cache_shards': self.cache_shards, 'resident_shards': list(self._resident),
+                'shard_loads': self.shard_loads, 'shard_hits': self.shard_hits,
+                'shard_evictions': self.shard_evictions, 'bytes_read': self.bytes_read}
+
+    def reset_io_stats(self) -> None:
+        """
+        Zero the shard load, hit, eviction and bytes read counters
+        """
+        self.shard_loads = 0
+        self.shard_hits = 0
+        self.shard_evictions = 0
+        self.bytes_read = 0
+
+    def add_vertex(self) -> int:
+        raise TypeError('sharded graphs are read-only, build a new one with ShardedGraph.build()')
+
+    def add_edge(self, src: int, dst: int, weight=1) -> None:
+        raise TypeError('sharded graphs are read-only, build a new one with ShardedGraph.build()')
+
+    def remove_edge(self, src: int, dst: int) -> None:
+        raise TypeError('sharded graphs are read-only, build a new one with ShardedGraph.build()')
+
+    def _allocate(self, n_vertices: int) -> None:
+        raise TypeError('sharded graphs are read-only, build a new one with ShardedGraph.build()')
+
+    def _write_edges(self, batch: dict) -> None:
+        raise TypeError('sharded graphs are read-only, build a new one with ShardedGraph.build()')
+
+    def degree(self, v: int) -> int:
+        """
+        Return number of edges leaving v (0 if v is not in the graph)
+        """
+        if v < 0 or v >= self.v_count:
+            return 0
+        return self._degree[v]
+
+    def num_edges(self) -> int:
+        """
+        Return number of edges in the graph, from the shard metadata
+        """
+        return self._meta.get('edges', 0)
+
+    def count_connected_components(self) -> int:
+        """
+        Return number of weakly connected components
+        Union-find over vertex ids in an int64 array, reading every shard once in order
+        """
+        parent = array('q', range(self.v_count))
+        count = self.v_count
+        for s in range(len(self._members)):
+            offsets, targets, _ = self._shard(s)
+            for i, v in enumerate(self._members[s]):
+                for pos in range(offsets[i], offsets[i + 1]):
+                    a, b = v, targets[pos]
+                    while parent[a] != a:
+                        parent[a] = parent[parent[a]]
+                        a = parent[a]
+                    while parent[b] != b:
+                        parent[b] = parent[parent[b]]
+                        b = parent[b]
+                    if a != b:
+                        parent[max(a, b)] = min(a, b)
+                        count -= 1
+        return count
+
+    def iter_bfs(self, v_start, v_end=None, stop=None, info=False):
+        """
+        Generator version of bfs(), yields the same vertices in the same order as DirectedGraph.iter_bfs
+        Runs level by level; each level is expanded in slices of at most about one shard of edges, whose rows
+        are read shard by shard first, so a shard is loaded at most once per slice
+        """
+        if v_start < 0 or v_start >= self.v_count:
+            return
+        budget = self._edge_budget()
+        # 0 = not seen, 1 = visited, 2 = waiting in the next level (a later copy would only be skipped)
+        state = bytearray(self.v_count)
+        level, parents, depth = array('q', [v_start]), array('q', [-1]), 0
+        while level:
+            following, following_parents = array('q'), array('q')
+            start = 0
+            while start < len(level):
+                end, edges = start, 0
+                while end < len(level) and (end == start or edges + self._degree[level[end]] <= budget):
+                    edges += self._degree[level[end]]
+                    end += 1
+                rows = self._rows([v for v in level[start:end] if state[v] != 1])
+                for k in range(start, end):
+                    v = level[k]
+                    if state[v] == 1:
+                        continue
+                    state[v] = 1
+                    if info:
+                        yield v, depth, parents[k] if parents[k] >= 0 else None
+                    else:
+                        yield v
+                    if v == v_end or (stop is not None and stop(v)):
+                        return
+                    for dst in rows.pop(v):
+                        if not state[dst]:
+                            state[dst] = 2
+                            following.append(dst)
+                            following_parents.append(v)
+                start = end
+            level, parents, depth = following, following_parents, depth + 1
+
+    def _dijkstra_from(self, src: int, dist, pred, settled: bytearray, touched: [], dst=None, counts=None) -> None:
+        """
+        Heap dijkstra as in DirectedGraph._dijkstra_from, with the same results
+        Whenever a shard has to be loaded, the rows of heap vertices in that shard are read with it, up to about
+        one shard of edges in all, and kept until they are settled, so the shards along the search front are not
+        loaded over and over
+        """
+        inf = float('inf')
+        dist[src] = 0
+        touched.append(src)
+        heap = [(0, src)]
+        budget = self._edge_budget()
+        prefetched = dict()
+        held = 0
+        pops = 0
+        while heap:
+            d, v = heapq.heappop(heap)
+            pops += 1
+            if settled[v]:
+                continue
+            settled[v] = 1
+            if v == dst:
+                break
+            row = prefetched.pop(v, None)
+            if row is not None:
+                held -= len(row[0])
+            else:
+                s = self._shard_of[v]
+                loading = s not in self._resident
+                row = self._row(v)
+                if loading:
+                    # nearest first, they are settled soonest
+                    waiting = sorted((dw, w) for dw, w in heap
+                                     if not settled[w] and self._shard_of[w] == s and w not in prefetched)
+                    for _, w in waiting:
+                        if held >= budget:
+                            break
+                        if w not in prefetched:
+                            prefetched[w] = self._row(w)
+                            held += self._degree[w]
+            for j, weight in zip(*row):
+                total_distance = d + weight
+                if total_distance < dist[j]:
+                    if dist[j] == inf:
+                        touched.append(j)
+                    dist[j] = total_distance
+                    pred[j] = v
+                    heapq.heappush(heap, (total_distance, j))
+        if counts is not None:
+            counts[0] += pops + len(heap)
+            counts[1] += pops
+
+    def _rows(self, vertices: []) -> dict:
+        """
+        Return {v: array of the targets of v's outgoing edges} for the given vertices, reading resident shards first
+        and then every other shard once
+        """
+        by_shard = dict()
+        for v in vertices:
+            by_shard.setdefault(self._shard_of[v], []).append(v)
+        rows = dict()
+        for s in sorted(by_shard, key=lambda s: s not in self._resident):
+            for v in by_shard[s]:
+                rows[v] = self._row(v)[0]
+        return rows
+
+    def _row(self, v: int) -> (array, array):
+        """
+        Return (targets, weights) array slices of the outgoing edges of v, in ascending dst order
+        """
+        offsets, targets, weights = self._shard(self._shard_of[v])
+        i = self._local[v]
+        lo, hi = offsets[i], offsets[i + 1]
+        return targets[lo:hi], weights[lo:hi]
+
+    def _edge_budget(self) -> int:
+        """
+        Return number of edges a query reads ahead at most, about the edges of one shard
+        """
+        return max(1, math.ceil(self._meta.get('edges', 0) / max(1, self._meta.get('shards', 1))))
+
+    def _neighbors(self, v: int):
+        """
+        Return iterable of (dst, weight) pairs for the outgoing edges of v, in ascending dst order
+        """
+        return zip(*self._row(v))
+
+    def _in_neighbors(self, v: int):
+        """
+        Return list of (src, weight) pairs for the incoming edges of v, in ascending src order
+        Shards only index outgoing edges, so this reads every shard
+        """
+        found = []
+        for s in range(len(self._members)):
+            offsets, targets, weights = self._shard(s)
+            for i, src in enumerate(self._members[s]):
+                lo, hi = offsets[i], offsets[i + 1]
+                pos = bisect_left(targets, v, lo, hi)
+                if pos < hi and targets[pos] == v:
+                    found.append((src, weights[pos]))
+        found.sort()
+        return found
+
+    def _weight(self, src: int, dst: int):
+        """
+        Return weight of the edge src -> dst, or 0 if there is no such edge
+        """
+        if src < 0 or dst < 0 or src >= self.v_count or dst >= self.v_count:
+            return 0
+        offsets, targets, weights = self._shard(self._shard_of[src])
+        i = self._local[src]
+        lo, hi = offsets[i], offsets[i + 1]
+        pos = bisect_left(targets, dst, lo, hi)
+        return weights[pos] if pos < hi and targets[pos] == dst else 0
+
+    def _shard(self, s: int):
+        """
+        Return (offsets, targets, weights) of shard s, loading it and evicting the least recently used shard if needed
+        """
+        data = self._resident.get(s)
+        if data is not None:
+            self.shard_hits += 1
+            self._resident.move_to_end(s)
+            return data
+        path = _shard_path(self._directory, s)
+        csr = graph_io.read_csr(path, mmap=False)
+        data = (csr.offsets, csr.targets, csr.weights)
+        self.shard_loads += 1
+        self.bytes_read += os.path.getsize(path)
+        self._resident[s] = data
+        while len(self._resident) > max(1, self.cache_shards):
+            self._resident.popitem(last=False)
+            self.shard_evictions += 1
+        return data
+
+    def _cross_edges(self):
+        """
+        Yield the (src, dst, weight) edges whose ends are in different shards, reading every shard once
+        """
+        for s in range(len(self._members)):
+            offsets, targets, weights = self._shard(s)
+            for i, v in enumerate(self._members[s]):
+                for pos in range(offsets[i], offsets[i + 1]):
+                    if self._shard_of[targets[pos]] != s:
+                        yield v, targets[pos], weights[pos]
+
+
+def hash_partition(n: int, shards: int) -> array:
+    """
+    Return array of the shard of every vertex, scattered by the high bits of a multiplicative hash of the vertex id
+    """
+    return array('i', ((((v * 2654435761) & 0xFFFFFFFF) >> 16) % shards for v in range(n)))
+
+
+def label_propagation(source, n: int, shards: int, rounds=LP_ROUNDS, slack=LP_SLACK) -> array:
+    """
+    Return array of the shard of every vertex, starting from blocks of consecutive ids (which keeps any locality
+    the numbering has) and then moving every vertex to the shard most of its neighbors (edges read as undirected)
+    are in, as long as that shard is below its size cap
+    - source() returns a fresh iterable of (src, dst, weight) edges, it is read once per round
+    - needs 4 * n * shards bytes for neighbor label counts
+    """
+    label = array('i', (v * shards // n for v in range(n)))
+    size = [0] * shards
+    for s in label:
+        size[s] += 1
+    capacity = math.ceil(n / shards * (1 + slack)) if shards else 0
+    for _ in range(rounds):
+        counts = array('i', [0]) * (n * shards)
+        for src, dst, weight in source():
+            if 0 <= src < n and 0 <= dst < n and src != dst and weight >= 0:
+                counts[src * shards + label[dst]] += 1
+                counts[dst * shards + label[src]] += 1
+        moved = 0
+        for v in range(n):
+            base = v * shards
+            current = best = label[v]
+            most = counts[base + current]
+            for s in range(shards):
+                if counts[base + s] > most and size[s] < capacity:
+                    best, most = s, counts[base + s]
+            if best != current:
+                size[current] -= 1
+                size[best] += 1
+                label[v] = best
+                moved += 1
+        if not moved:
+            break
+    return label
+
+
+def _edge_source(edges, spill_path=None):
+    """
+    Return function that returns a fresh iterable of the (src, dst, weight) edges
+    A one-shot iterator is written to spill_path first, if given, so it can be read more than once
+    """
+    if isinstance(edges, (str, os.PathLike)):
+        return lambda: (edge for chunk in graph_io.read_edge_chunks(edges) for edge in chunk)
+    if callable(edges):
+        return edges
+    if spill_path is not None and iter(edges) is edges:
+        graph_io.write_edge_list(spill_path, edges)
+        return _edge_source(spill_path)
+    return lambda: edges
+
+
+def _index(shard_of: array, shards: int) -> (array, []):
+    """
+    Return (local, members): local[v] is v's row in its shard, members[s] the vertices of shard s in id order
+    """
+    local = array('q', [0]) * len(shard_of)
+    members = [array('q') for _ in range(shards)]
+    for v, s in enumerate(shard_of):
+        local[v] = len(members[s])
+        members[s].append(v)
+    return local, members
+
+
+def _shard_path(directory, s: int) -> str:
+    return os.path.join(directory, f'shard-{s}.bin')
+
+
+def _bucket_paths(directory, s: int) -> (str, str, str):
+    return tuple(os.path.join(directory, f'bucket-{s}.{part}') for part in ('keys', 'weights', 'floats'))
+
+
+def _spill(directory, s: int, keys: array, weights: array, floats: bytearray) -> None:
+    """
+    Append buffered edges of shard s to its bucket files and empty the buffers
+    """
+    for path, values in zip(_bucket_paths(directory, s), (keys, weights, floats)):
+        with open(path, 'ab') as f:
+            f.write(values)
+        del values[:]
+
+
+def _read_bucket(directory, s: int) -> (array, array, bytearray):
+    """
+    Return (keys, weights, floats) of the edges bucketed for shard s and delete the bucket files
+    """
+    bucket = (array('q'), array('q'), bytearray())
+    for path, values in zip(_bucket_paths(directory, s), bucket):
+        with open(path, 'rb') as f:
+            data = f.read()
+        if isinstance(values, array):
+            values.frombytes(data)
+        else:
+            values.extend(data)
+        os.remove(path)
+    return bucket
+
+
+def _write_shard(directory, s: int, rows: int, n: int, keys: array, weights: array, floats: bytearray) -> int:
+    """
+    Sort the bucketed edges of shard s into CSR rows, keep the last of duplicate edges, drop weight 0 edges
+    and write the shard file; return its number of edges
+    Int weights are written as int64, a shard with float weights gets a list so graph_io keeps the ints exact
+    """
+    if np is not None:
+        order = array('q')
+        order.frombytes(np.argsort(np.frombuffer(keys, dtype=np.int64), kind='stable').astype(np.int64).tobytes())
+    else:
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+    offsets = array('q', [0]) * (rows + 1)
+    targets = array('q')
+    kept = list() if any(floats) else array('q')
+    for k, i in enumerate(order):
+        # equal keys stay in input order, so only the last of a run is kept
+        if k + 1 < len(order) and keys[order[k + 1]] == keys[i]:
+            continue
+        weight = _FLOAT_BITS.unpack(_INT_BITS.pack(weights[i]))[0] if floats[i] else weights[i]
+        if weight > 0:
+            row, dst = divmod(keys[i], n)
+            offsets[row + 1] += 1
+            targets.append(dst)
+            kept.append(weight)
+    for row in range(rows):
+        offsets[row + 1] += offsets[row]
+    graph_io.write_csr(_shard_path(directory, s), True, offsets, targets, kept)
+    return len(targets)
+
+
+def _write_meta(directory, meta: dict) -> None:
+    with open(os.path.join(directory, META_FILE), 'w') as f:
+        json.dump(meta, f, indent=2)
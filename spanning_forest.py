@@ -0,0 +1,79 @@
+# Course: CS261 - Data Structures
+# Author: Alexandra Fren
+# Description: Minimum spanning forests of weighted undirected graphs given as integer vertex ids. kruskal() works on
+# flat edge arrays: it sorts edge positions by weight (with numpy when it is installed, which keeps 10^7 edges in a
+# few flat int64 arrays) and joins trees with an array based union-find. prim() grows one tree per component from
+# a lazy heap like the one dijkstra uses, skipping stale entries when they are popped
+
+from array import array
+import heapq
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, kruskal() sorts a list of edge positions instead
+    np = None
+
+
+def kruskal(n: int, src, dst, weights) -> array:
+    """
+    Return array of the positions of the edges in a minimum spanning forest, lightest first
+    - vertices are ints below n, edge i joins src[i] and dst[i] with weight weights[i]
+    - equal weights keep their order in the arrays, so the result is deterministic
+    """
+    m = len(src)
+    if np is not None:
+        # back into an int64 array, iterating it is much faster than iterating numpy scalars
+        order = array('q')
+        order.frombytes(np.argsort(np.asarray(weights), kind='stable').astype(np.int64).tobytes())
+    else:
+        order = sorted(range(m), key=weights.__getitem__)
+    parent = array('q', range(n))
+    size = array('q', [1]) * n
+    picked = array('q')
+    for i in order:
+        a, b = src[i], dst[i]
+        # find both roots with path halving
+        while parent[a] != a:
+            parent[a] = parent[parent[a]]
+            a = parent[a]
+        while parent[b] != b:
+            parent[b] = parent[parent[b]]
+            b = parent[b]
+        if a == b:
+            continue
+        if size[a] < size[b]:
+            a, b = b, a
+        parent[b] = a
+        size[a] += size[b]
+        picked.append(i)
+        if len(picked) == n - 1:
+            break
+    return picked
+
+
+def prim(vertices, neighbors) -> []:
+    """
+    Return list of (u, v, weight) edges of a minimum spanning forest, in the order they join their tree
+    - vertices lists the int ids, each tree is grown from the first of its vertices in that list
+    - neighbors(v) returns (w, weight) pairs of the edges at v
+    """
+    vertices = list(vertices)
+    done = bytearray(max(vertices) + 1 if vertices else 0)
+    forest = []
+    for root in vertices:
+        if done[root]:
+            continue
+        done[root] = 1
+        heap = [(weight, root, j) for j, weight in neighbors(root) if not done[j]]
+        heapq.heapify(heap)
+        while heap:
+            weight, i, j = heapq.heappop(heap)
+            if done[j]:
+                # stale entry, j was reached by a lighter edge after this one was pushed
+                continue
+            done[j] = 1
+            forest.append((i, j, weight))
+            for k, w in neighbors(j):
+                if not done[k]:
+                    heapq.heappush(heap, (w, j, k))
+    return forest
@@ -3,9 +3,24 @@
 # Assignment: Six
 # Description: This program creates an undirected graph, with methods to add a vertex or edge, remove a vertex or edge,
 # get a list of all vertices or edges, do a dfs or bfs, check if a passed path is valid, check for cycles, and returns
-# the count of connected components.
+# the count of connected components. Vertex names are interned to dense integer ids: the graph is stored as one
+# insertion-ordered neighbor set of ids per vertex, and traversals, cycle checks and components run on ids. adj_list is
+# a read-only view that translates back to names, so printing and edge order stay those of a neighbor list.
+# enable_cache() keeps repeated query results until the next edit, abfs() and adfs() run traversals from asyncio code
 
+from array import array
 from collections import deque
+from collections.abc import Mapping, Sequence
+
+import async_graph
+import bitset_bfs
+from disjoint_set import DisjointSet
+import graph_io
+import graph_pool
+import instrumentation
+from result_cache import ResultCache, cached, DEFAULT_MAX_BYTES
+import spanning_forest
+
 
 class UndirectedGraph:
     """
@@ -16,6 +31,13 @@ class UndirectedGraph:
     - vertex names are strings
     """
 
+    # bumped by every edit, cached query results are only reused for the same version
+    _version = 0
+    # ResultCache of query results while enable_cache() is on
+    _cache = None
+    # instrumentation.Instrumentation while enable_instrumentation() is on
+    _instrumentation = None
+
     def __init__(self, start_edges=None):
         """
         Store graph info as adjacency list
@@ -45,14 +67,45 @@ class UndirectedGraph:
     # functions above line were provided, functions below were created for the assignment #
     # ----------------------------------------------------------------------------------- #
 
+    @property
+    def adj_list(self):
+        """
+        Read-only mapping of vertex name -> neighbor names, in insertion order
+        """
+        return _AdjacencyView(self)
+
+    @adj_list.setter
+    def adj_list(self, adjacency) -> None:
+        """
+        Replace the whole graph with the vertices and edges of a {name: neighbor names} mapping
+        """
+        # name -> id in vertex insertion order, and id -> name (None for ids freed by remove_vertex)
+        self._ids = dict()
+        self._names = []
+        # id -> insertion-ordered set of neighbor ids (None for freed ids)
+        self._adj = []
+        self._free = []
+        # number of edges, kept up to date by the edit methods so num_edges() is O(1)
+        self._edge_count = 0
+        # union-find index of connected components, built on first use and then kept up to date by the edit methods
+        self._components = None
+        # id -> neighbor ids sorted by name, used to pick traversal order without sorting on every visit
+        self._order = []
+        self._version += 1
+        for v in adjacency:
+            self.add_vertex(v)
+        for u in adjacency:
+            for v in adjacency[u]:
+                self.add_edge(u, v)
+
     def add_vertex(self, v: str) -> None:
         """
         Add new vertex to the graph if not already present in the graph
         """
-        if v not in self.adj_list:
-            self.adj_list[v] = []
+        if v not in self._ids:
+            self._intern(v)
         return
-        
+
     def add_edge(self, u: str, v: str) -> None:
         """
         Add edge to the graph if valid inputs
@@ -60,25 +113,36 @@ class UndirectedGraph:
         if u == v:
             return
         else:
-            if u not in self.adj_list:
-                self.add_vertex(u)
-            if v not in self.adj_list:
-                self.add_vertex(v)
-            if v not in self.adj_list[u]:
-                self.adj_list[u].append(v)
-            if u not in self.adj_list[v]:
-                self.adj_list[v].append(u)
+            a = self._ids.get(u)
+            if a is None:
+                a = self._intern(u)
+            b = self._ids.get(v)
+            if b is None:
+                b = self._intern(v)
+            if b not in self._adj[a]:
+                self._adj[a].append(b)
+                self._adj[b].append(a)
+                self._edge_count += 1
+                self._order[a] = self._order[b] = None
+                self._version += 1
+                if self._components is not None:
+                    self._components.union(a, b)
             return
 
     def remove_edge(self, v: str, u: str) -> None:
         """
         Remove edge from the graph
         """
-        if v in self.adj_list and u in self.adj_list:
-            if u in self.adj_list[v]:
-                self.adj_list[v].remove(u)
-            if v in self.adj_list[u]:
-                self.adj_list[u].remove(v)
+        a, b = self._ids.get(v), self._ids.get(u)
+        if a is not None and b is not None:
+            if b in self._adj[a]:
+                self._adj[a].remove(b)
+                self._adj[b].remove(a)
+                self._edge_count -= 1
+                self._order[a] = self._order[b] = None
+                self._version += 1
+                if self._components is not None and not self._still_connected(a, b):
+                    self._rebuild_components(self._components.discard_set(a))
         else:
             return
 
@@ -86,38 +150,213 @@ class UndirectedGraph:
         """
         Remove vertex and all connected edges
         """
-        if v in self.adj_list:
-            self.adj_list.pop(v)
-            keys = self.adj_list.keys()
-            for i in keys:
-                if v in self.adj_list[i]:
-                    self.adj_list[i].remove(v)
+        if v in self._ids:
+            a = self._ids.pop(v)
+            # only v's own neighbors can have v in their neighbor sets
+            self._edge_count -= len(self._adj[a])
+            for i in self._adj[a]:
+                self._adj[i].remove(a)
+                self._order[i] = None
+            self._adj[a] = self._names[a] = self._order[a] = None
+            self._free.append(a)
+            self._version += 1
+            if self._components is not None:
+                members = self._components.discard_set(a)
+                members.remove(a)
+                self._rebuild_components(members)
             return
         else:
             return
 
+    @classmethod
+    def from_edges(cls, edges, n_vertices=None):
+        """
+        Build a graph from an iterable of (u, v) edges
+        n_vertices is accepted so both graph classes share one signature, vertices here are named by the edges
+        """
+        graph = cls()
+        graph.add_edges(edges)
+        return graph
+
+    def add_edges(self, edges) -> None:
+        """
+        Add a batch of (u, v) edges, skipping loops and duplicates
+        Leaves the graph exactly as calling add_edge() on each pair in order would
+        """
+        ids, adj, order = self._ids, self._adj, self._order
+        for u, v in edges:
+            if u == v:
+                continue
+            a = ids.get(u)
+            if a is None:
+                a = self._intern(u)
+            b = ids.get(v)
+            if b is None:
+                b = self._intern(v)
+            if b in adj[a]:
+                continue
+            adj[a].append(b)
+            adj[b].append(a)
+            order[a] = order[b] = None
+            self._edge_count += 1
+            self._version += 1
+            if self._components is not None:
+                self._components.union(a, b)
+
+    def remove_edges(self, edges) -> None:
+        """
+        Remove a batch of (u, v) edges, then re-partition the component index once for the whole batch
+        """
+        removed = []
+        for u, v in edges:
+            a, b = self._ids.get(u), self._ids.get(v)
+            if a is not None and b is not None and b in self._adj[a]:
+                self._adj[a].remove(b)
+                self._adj[b].remove(a)
+                self._order[a] = self._order[b] = None
+                self._edge_count -= 1
+                self._version += 1
+                removed.append((a, b))
+        if self._components is not None:
+            # the index still has the old components, re-partition only those that really split
+            for a, b in removed:
+                if self._components.connected(a, b) and not self._still_connected(a, b):
+                    self._rebuild_components(self._components.discard_set(a))
+
+    def save(self, path) -> None:
+        """
+        Write the graph to path in the binary CSR format of graph_io, with a table of vertex names
+        Vertex and neighbor order are kept, so a loaded graph prints the same
+        """
+        names = list(self._ids)
+        position = array('q', [0]) * len(self._names)
+        for pos, a in enumerate(self._ids.values()):
+            position[a] = pos
+        offsets = array('q', [0])
+        targets = array('q')
+        for a in self._ids.values():
+            targets.extend(position[i] for i in self._adj[a])
+            offsets.append(len(targets))
+        graph_io.write_csr(path, False, offsets, targets, names=names)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Load a graph written by save(), reading the file through a shared memory map if mmap is True
+        File positions become the vertex ids, so the neighbor sets are filled straight from the target array
+        """
+        data = graph_io.read_csr(path, mmap)
+        if data.directed:
+            raise ValueError(f'{path} holds a directed graph')
+        graph = cls()
+        offsets, targets = data.offsets, data.targets
+        for i, name in enumerate(data.names):
+            graph._intern(name)
+            graph._adj[i] = _NeighborSet.fromkeys(targets[offsets[i]:offsets[i + 1]])
+        graph._edge_count = len(targets) // 2
+        return graph
+
+    @classmethod
+    def read_edge_list(cls, path, fmt=None, chunk_size=graph_io.CHUNK_SIZE, skip_header=False):
+        """
+        Build a graph from an edge list text file of "u v" rows (see graph_io.read_edge_chunks), one chunk at a time
+        """
+        graph = cls()
+        for chunk in graph_io.read_edge_chunks(path, fmt, False, chunk_size, skip_header):
+            graph.add_edges(chunk)
+        return graph
+
+    def write_edge_list(self, path, fmt=None) -> int:
+        """
+        Stream the edges to an edge list text file without building the edge list, return edge count
+        """
+        return graph_io.write_edge_list(path, self.edges(), fmt)
+
+    def enable_cache(self, max_bytes=DEFAULT_MAX_BYTES) -> None:
+        """
+        Keep results of dfs, bfs and count_connected_components until the next edit
+        - results are keyed by method and arguments, and callers get copies they are free to change
+        - least recently used results are dropped to stay under max_bytes
+        """
+        self._cache = ResultCache(max_bytes)
+
+    def disable_cache(self) -> None:
+        """
+        Stop caching query results and drop the cached ones
+        """
+        self._cache = None
+
+    def cache_stats(self) -> dict:
+        """
+        Return dict of cache hits, misses, evictions, invalidations, entries and bytes, or None if caching is off
+        """
+        return None if self._cache is None else self._cache.stats()
+
+    def enable_instrumentation(self, callback=None) -> instrumentation.Instrumentation:
+        """
+        Record calls of dfs, bfs, has_cycle, count_connected_components and the edit methods on this graph, see instrumentation
+        callback(event) is called after every call, e.g. to feed an external metrics sink
+        """
+        return instrumentation.enable(self, callback)
+
+    def disable_instrumentation(self) -> None:
+        """
+        Stop recording calls, the graph runs the plain methods again
+        """
+        instrumentation.disable(self)
+
+    def instrumentation_stats(self) -> dict:
+        """
+        Return dict of recorded statistics per operation, or None if instrumentation is off
+        """
+        return None if self._instrumentation is None else self._instrumentation.report()
+
     def get_vertices(self) -> []:
         """
         Return list of vertices in the graph (any order)
         """
-        return list(self.adj_list.keys())
+        return list(self._ids)
 
     def get_edges(self) -> []:
         """
         Return list of edges in the graph (any order)
         """
-        edge_list = []
-        keys = self.adj_list.keys()
-        for i in keys:
-            l = self.adj_list[i]
-            count = 0
-            while count < len(l):
-                pair1 = tuple((i, l[count]))
-                pair2 = tuple((l[count], i))
-                if pair1 not in edge_list and pair2 not in edge_list:
-                    edge_list.append(pair1)
-                count += 1
-        return edge_list
+        return list(self.edges())
+
+    def edges(self):
+        """
+        Yield every edge once without building a list, in the same order as get_edges()
+        An edge is reported from whichever end comes first in vertex order
+        """
+        names = self._names
+        done = bytearray(len(names))
+        for a in self._ids.values():
+            for b in self._adj[a]:
+                if not done[b]:
+                    yield names[a], names[b]
+            done[a] = 1
+
+    def neighbors(self, v):
+        """
+        Return iterator over v's neighbors in insertion order (empty if v is not in the graph)
+        """
+        a = self._ids.get(v)
+        if a is None:
+            return iter(())
+        return map(self._names.__getitem__, self._adj[a])
+
+    def degree(self, v) -> int:
+        """
+        Return number of edges at v (0 if v is not in the graph)
+        """
+        a = self._ids.get(v)
+        return 0 if a is None else len(self._adj[a])
+
+    def num_edges(self) -> int:
+        """
+        Return number of edges in the graph
+        """
+        return self._edge_count
 
     def is_valid_path(self, path: []) -> bool:
         """
@@ -128,103 +367,380 @@ class UndirectedGraph:
         else:
             counter = 0
             for i in path:
-                if i not in self.adj_list:
+                if i not in self._ids:
                     return False
                 if counter == len(path) - 1:
                     return True
                 else:
-                    check_val = path[counter + 1]
-                    if check_val not in self.adj_list[i]:
+                    check_val = self._ids.get(path[counter + 1])
+                    if check_val not in self._adj[self._ids[i]]:
                         return False
                 counter += 1
 
+    @cached
     def dfs(self, v_start, v_end=None) -> []:
         """
         Return list of vertices visited during DFS search
-        Vertices are picked in alphabetical order (see sort method used)
+        Vertices are picked in alphabetical order (see _sorted_neighbors)
         """
-        if v_start not in self.adj_list:
-            return []
-        visitors = list()
-        stack = deque()
-        stack.append(v_start)
-        while stack:
-            v = stack.pop()
-            if v == v_end:
-                visitors.append(v)
-                stack = deque()
-            if v not in visitors:
-                visitors.append(v)
-                holder = list()
-                for i in self.adj_list[v]:
-                    if i not in visitors:
-                        holder.append(i)
-                    holder.sort(reverse=True)
-                for i in holder:
-                    stack.append(i)
-        return visitors
+        return list(self.iter_dfs(v_start, v_end))
 
+    @cached
     def bfs(self, v_start, v_end=None) -> []:
         """
         Return list of vertices visited during BFS search
-        Vertices are picked in alphabetical order (see sort method used)
+        Vertices are picked in alphabetical order (see _sorted_neighbors)
+        """
+        return list(self.iter_bfs(v_start, v_end))
+
+    def iter_dfs(self, v_start, v_end=None, stop=None, info=False):
+        """
+        Generator version of dfs(), yields vertices lazily in the same order
+        - with info=True yields (vertex, depth, parent) tuples, parent is None for v_start
+        - stops after yielding v_end, or the first vertex for which stop(vertex) is True
+        """
+        start = self._ids.get(v_start)
+        if start is None:
+            return
+        end = self._ids.get(v_end, -1)
+        names = self._names
+        visited = bytearray(len(names))
+        stack = deque()
+        stack.append((start, 0, -1))
+        while stack:
+            v, depth, parent = stack.pop()
+            if visited[v]:
+                continue
+            visited[v] = 1
+            yield (names[v], depth, names[parent] if parent >= 0 else None) if info else names[v]
+            if v == end or (stop is not None and stop(names[v])):
+                return
+            holder = [(i, depth + 1, v) for i in self._sorted_neighbors(v) if not visited[i]]
+            holder.reverse()
+            stack.extend(holder)
+
+    def iter_bfs(self, v_start, v_end=None, stop=None, info=False):
         """
-        if v_start not in self.adj_list:
-            return []
+        Generator version of bfs(), yields vertices lazily in the same order
+        - with info=True yields (vertex, depth, parent) tuples, depth is the hop count from v_start
+        - stops after yielding v_end, or the first vertex for which stop(vertex) is True
+        """
+        start = self._ids.get(v_start)
+        if start is None:
+            return
+        end = self._ids.get(v_end, -1)
+        names = self._names
+        visited = bytearray(len(names))
         h = deque()
-        visitors = list()
-        h.append(v_start)
+        h.append((start, 0, -1))
         while h:
-            v = h.popleft()
-            if v == v_end:
-                visitors.append(v)
-                h = []
-            if v not in visitors:
-                visitors.append(v)
-                holder = []
-                for i in self.adj_list[v]:
-                    if i not in visitors:
-                        holder.append(i)
-                holder.sort()
-                for i in holder:
-                    h.append(i)
-        return visitors
+            v, depth, parent = h.popleft()
+            if visited[v]:
+                continue
+            visited[v] = 1
+            yield (names[v], depth, names[parent] if parent >= 0 else None) if info else names[v]
+            if v == end or (stop is not None and stop(names[v])):
+                return
+            h.extend([(i, depth + 1, v) for i in self._sorted_neighbors(v) if not visited[i]])
+
+    async def abfs(self, v_start, v_end=None, timeout=None, cancel=None, offload=False, executor=None,
+                   every=async_graph.YIELD_EVERY) -> []:
+        """
+        Async bfs() that does not block the event loop, see async_graph.collect
+        Returns the vertices visited so far if timeout runs out or cancel is set
+        """
+        return await async_graph.collect(self.iter_bfs(v_start, v_end), timeout, cancel, offload, executor, every)
+
+    async def adfs(self, v_start, v_end=None, timeout=None, cancel=None, offload=False, executor=None,
+                   every=async_graph.YIELD_EVERY) -> []:
+        """
+        Async dfs() that does not block the event loop, see async_graph.collect
+        Returns the vertices visited so far if timeout runs out or cancel is set
+        """
+        return await async_graph.collect(self.iter_dfs(v_start, v_end), timeout, cancel, offload, executor, every)
+
+    def multi_bfs(self, sources, distances=False, direction='auto') -> []:
+        """
+        Return one result per source vertex: the set of vertices BFS from it reaches, or with distances=True
+        a {vertex: hop count} dict (empty for sources not in the graph)
+        Sources are searched 64 at a time with bit-parallel frontiers, see bitset_bfs
+        """
+        ids = [self._ids[s] for s in sources if s in self._ids]
+        neighbors = self._adj.__getitem__
+        found = bitset_bfs.multi_bfs(ids, list(self._ids.values()), neighbors, neighbors, len(self._names),
+                                     distances, direction)
+        names = self._names
+        found.reverse()
+        results = []
+        for s in sources:
+            if s not in self._ids:
+                results.append({} if distances else set())
+            elif distances:
+                results.append({names[a]: hops for a, hops in found.pop().items()})
+            else:
+                results.append({names[a] for a in found.pop()})
+        return results
+
+    def map_sources(self, algorithm, sources, workers=None, chunk_size=None) -> []:
+        """
+        Return [self.<algorithm>(s) for s in sources] computed on a pool of worker processes, see graph_pool
+        algorithm is a method name such as 'bfs' or a picklable function (graph, source)
+        Every worker loads its own copy of the adjacency, so memory grows with the number of workers
+        """
+        return graph_pool.map_sources(self, algorithm, sources, workers, chunk_size)
+
+    def _intern(self, v) -> int:
+        """
+        Add vertex name v (not yet in the graph) and return its id, reusing ids of removed vertices
+        """
+        if self._free:
+            a = self._free.pop()
+            self._names[a] = v
+            self._adj[a] = _NeighborSet()
+        else:
+            a = len(self._names)
+            self._names.append(v)
+            self._adj.append(_NeighborSet())
+            self._order.append(None)
+        self._ids[v] = a
+        self._version += 1
+        if self._components is not None:
+            self._components.add(a)
+        return a
+
+    def _sorted_neighbors(self, a: int) -> []:
+        """
+        Return ids of a's neighbors in alphabetical order of their names, cached until an edge at a changes
+        """
+        holder = self._order[a]
+        if holder is None:
+            holder = self._order[a] = sorted(self._adj[a], key=self._names.__getitem__)
+        return holder
 
+    @cached
     def count_connected_components(self):
         """
         Return number of connected components in the graph
         """
-        compare_lists = []
-        for i in self.get_vertices():
-            comp = sorted(self.dfs(i))
-            if comp not in compare_lists:
-                compare_lists.append(comp)
-        return len(compare_lists)
+        return self._component_index().count
 
-    def has_cycle(self):
+    def component_of(self, v):
         """
-        Return True if graph contains a cycle, False otherwise
+        Return the representative vertex of v's connected component, or None if v is not in the graph
+        Representatives identify components only until the next edit
+        """
+        if v not in self._ids:
+            return None
+        return self._names[self._component_index().find(self._ids[v])]
+
+    def same_component(self, u, v) -> bool:
         """
-        if len(self.get_vertices()) == 0 or len(self.get_vertices()) == 1:
+        Return True if u and v are both in the graph and connected by some path
+        """
+        if u not in self._ids or v not in self._ids:
             return False
+        return self._component_index().connected(self._ids[u], self._ids[v])
+
+    def _component_index(self) -> DisjointSet:
+        """
+        Return the connected components index over vertex ids, building it from the edge list on first use
+        """
+        if self._components is None:
+            self._components = DisjointSet(self._ids.values(), track_members=True)
+            for a in self._ids.values():
+                for b in self._adj[a]:
+                    self._components.union(a, b)
+        return self._components
+
+    def _still_connected(self, a: int, b: int) -> bool:
+        """
+        Return True if a and b are still connected after an edge between them was removed
+        Runs a BFS from each end in lockstep, so a split costs O(size of the smaller side)
+        """
+        seen_a, seen_b = {a}, {b}
+        h_a, h_b = deque([a]), deque([b])
+        while h_a and h_b:
+            for h, seen, other in ((h_a, seen_a, seen_b), (h_b, seen_b, seen_a)):
+                cur = h.popleft()
+                for i in self._adj[cur]:
+                    if i in other:
+                        return True
+                    if i not in seen:
+                        seen.add(i)
+                        h.append(i)
+                if not h:
+                    # one side ran out of vertices without meeting the other
+                    return False
+        return False
+
+    def _rebuild_components(self, vertices) -> None:
+        """
+        Re-add vertex ids of a discarded component to the index, one BFS per new component
+        """
+        index = self._components
+        for x in vertices:
+            if x in index:
+                continue
+            index.add(x)
+            h = deque([x])
+            while h:
+                cur = h.popleft()
+                for i in self._adj[cur]:
+                    if i not in index:
+                        index.add(i)
+                        index.union(x, i)
+                        h.append(i)
+
+    def has_cycle(self, witness=False):
+        """
+        Return True if graph contains a cycle, False otherwise
+        With witness=True, return the vertices of one cycle in edge order instead ([] if there is none)
+        Union-find over the edge list, O(V + E)
+        """
+        sets = DisjointSet(self._ids.values())
+        forest = dict()
+        done = bytearray(len(self._names))
+        for a in self._ids.values():
+            for b in self._adj[a]:
+                if done[b]:
+                    # edge already seen from the other end
+                    continue
+                if sets.union(a, b):
+                    if witness:
+                        forest.setdefault(a, []).append(b)
+                        forest.setdefault(b, []).append(a)
+                    continue
+                # a and b were already connected, so edge a-b closes a cycle
+                if not witness:
+                    return True
+                return [self._names[i] for i in self._forest_path(forest, a, b)]
+            done[a] = 1
+        return [] if witness else False
+
+    @staticmethod
+    def _forest_path(forest: dict, u, v) -> []:
+        """
+        Return the vertices on the unique path from u to v in a forest given as adjacency lists
+        """
+        prev = {u: None}
+        h = deque([u])
+        while h:
+            cur = h.popleft()
+            if cur == v:
+                break
+            for i in forest.get(cur, ()):
+                if i not in prev:
+                    prev[i] = cur
+                    h.append(i)
+        path = [v]
+        while path[-1] != u:
+            path.append(prev[path[-1]])
+        path.reverse()
+        return path
+
+    def minimum_spanning_forest(self, weight=None, method='kruskal'):
+        """
+        Return (total weight, [(u, v, weight), ...]) of a minimum spanning forest
+        - weight(u, v) gives the weight of edge u-v, every edge weighs 1 if it is None
+        - method 'kruskal' sorts the edge arrays and joins trees with union-find, 'prim' grows each tree from a
+          lazy heap; both are in spanning_forest
+        """
+        if weight is None:
+            def weight(u, v):
+                return 1
+        names = self._names
+        if method == 'kruskal':
+            # every edge once, from its lower id end
+            sources, targets, weights = array('q'), array('q'), []
+            for a in self._ids.values():
+                for b in self._adj[a]:
+                    if a < b:
+                        sources.append(a)
+                        targets.append(b)
+                        weights.append(weight(names[a], names[b]))
+            picked = spanning_forest.kruskal(len(names), sources, targets, weights)
+            forest = [(names[sources[i]], names[targets[i]], weights[i]) for i in picked]
+        elif method == 'prim':
+            def neighbors(a):
+                return [(b, weight(names[a], names[b])) for b in self._adj[a]]
+            forest = [(names[a], names[b], w) for a, b, w in spanning_forest.prim(self._ids.values(), neighbors)]
         else:
-            for index in range(len(self.get_vertices())):
-                prev = self.get_vertices()[index]
-                accessed = []
-                s = [(prev, prev)]
-                while s:
-                    v = s.pop()
-                    cur = v[0]
-                    prev = v[1]
-                    if cur not in accessed:
-                        accessed.append(cur)
-                    for i in sorted(self.adj_list[cur], reverse=True):
-                        if i not in accessed:
-                            s.append((i, cur))
-                        if i in accessed and i != prev:
-                            # eliminate possibility of loop
-                            return True
-            return False
+            raise ValueError(f'unknown method {method!r}')
+        return sum(w for _, _, w in forest), forest
+
+
+class _NeighborSet(dict):
+    """
+    Insertion-ordered set of a vertex's neighbor ids (the dict keys), with O(1) membership, append and remove
+    Internal storage only, adj_list hands out neighbors as _NeighborNames, which compare and index like a list
+    """
+
+    def append(self, v) -> None:
+        self[v] = None
+
+    def remove(self, v) -> None:
+        del self[v]
+
+
+class _AdjacencyView(Mapping):
+    """
+    Read-only {vertex name: neighbor names} mapping of an UndirectedGraph, in vertex insertion order
+    Compares equal to a dict of the same names and neighbor lists
+    """
+
+    def __init__(self, graph: UndirectedGraph):
+        self._graph = graph
+
+    def __getitem__(self, v) -> '_NeighborNames':
+        return _NeighborNames(self._graph, self._graph._ids[v])
+
+    def __contains__(self, v) -> bool:
+        return v in self._graph._ids
+
+    def __iter__(self):
+        return iter(self._graph._ids)
+
+    def __len__(self) -> int:
+        return len(self._graph._ids)
+
+    def keys(self):
+        return self._graph._ids.keys()
+
+    def __repr__(self) -> str:
+        return repr({v: self[v] for v in self})
+
+
+class _NeighborNames(Sequence):
+    """
+    Read-only view of one vertex's neighbors by name, prints, compares and indexes like a list of names
+    Indexing walks the neighbors, so it is O(degree)
+    """
+
+    def __init__(self, graph: UndirectedGraph, a: int):
+        self._graph = graph
+        self._a = a
+
+    def __iter__(self):
+        return map(self._graph._names.__getitem__, self._graph._adj[self._a])
+
+    def __len__(self) -> int:
+        return len(self._graph._adj[self._a])
+
+    def __contains__(self, v) -> bool:
+        return self._graph._ids.get(v) in self._graph._adj[self._a]
+
+    def __getitem__(self, i):
+        return list(self)[i]
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (list, _NeighborNames)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return repr(list(self))
 
 
 if __name__ == '__main__':
@@ -337,3 +853,84 @@ if __name__ == '__main__':
         u, v = edge
         g.add_edge(u, v) if command == 'add' else g.remove_edge(u, v)
         print('{:<10}'.format(case), g.has_cycle())
+
+
+    print("\nhas_cycle() witness example")
+    print("---------------------------")
+    g = UndirectedGraph(['AB', 'BC', 'CD', 'DB', 'DE'])
+    print(g.has_cycle(witness=True))
+    g.remove_edge('B', 'D')
+    print(g.has_cycle(witness=True))
+
+
+    print("\ncomponent_of() / same_component() example")
+    print("------------------------------------------")
+    g = UndirectedGraph(['AB', 'BC', 'DE'])
+    print(g.count_connected_components(), g.same_component('A', 'C'), g.same_component('A', 'E'))
+    g.add_edge('C', 'D')
+    print(g.count_connected_components(), g.same_component('A', 'E'), g.component_of('A') == g.component_of('E'))
+    g.remove_edge('B', 'C')
+    print(g.count_connected_components(), g.same_component('A', 'E'), g.same_component('C', 'E'))
+
+
+    print("\niter_dfs() / iter_bfs() example")
+    print("-------------------------------")
+    g = UndirectedGraph(['AE', 'AC', 'BE', 'CE', 'CD', 'CB', 'BD', 'ED', 'BH', 'QG', 'FG'])
+    print(list(g.iter_bfs('A', info=True)))
+    first_three = g.iter_dfs('A')
+    print([next(first_three) for _ in range(3)])
+
+
+    print("\nfrom_edges() / add_edges() / remove_edges() example")
+    print("---------------------------------------------------")
+    g = UndirectedGraph.from_edges(['AB', 'AC', 'BC', 'BD', 'CD', 'CE', 'DE', 'BA'])
+    print(g)
+    g.remove_edges(['AB', 'CE', 'XY'])
+    g.add_edges(['AE', 'EA', 'FF'])
+    print(g, g.count_connected_components())
+
+
+    print("\nsave() / load() example")
+    print("-----------------------")
+    import os
+    import tempfile
+    g = UndirectedGraph(['AE', 'AC', 'BE', 'CE', 'CD', 'CB', 'BD', 'ED', 'BH', 'QG', 'FG'])
+    path = os.path.join(tempfile.mkdtemp(), 'graph.bin')
+    g.save(path)
+    print(str(UndirectedGraph.load(path)) == str(g), UndirectedGraph.load(path).bfs('A'))
+
+
+    print("\nenable_cache() example")
+    print("----------------------")
+    g = UndirectedGraph(['AB', 'AC', 'BC', 'DE'])
+    g.enable_cache()
+    print(g.bfs('A'), g.bfs('A'), g.count_connected_components())
+    g.remove_vertex('C')
+    print(g.bfs('A'), g.cache_stats())
+
+
+    print("\nenable_instrumentation() example")
+    print("--------------------------------")
+    g = UndirectedGraph(['AB', 'AC', 'BC', 'DE'])
+    g.enable_instrumentation()
+    g.bfs('A')
+    g.remove_vertex('C')
+    print(g.count_connected_components())
+    for op, stats in g.instrumentation_stats().items():
+        print(op, {k: stats[k] for k in ('calls', 'vertices', 'edges')})
+    g.disable_instrumentation()
+
+
+    print("\nminimum_spanning_forest() example")
+    print("---------------------------------")
+    g = UndirectedGraph(['AB', 'AC', 'BC', 'CD', 'BD', 'EF'])
+    lengths = {'AB': 4, 'AC': 1, 'BC': 2, 'CD': 7, 'BD': 3, 'EF': 5}
+    print(g.minimum_spanning_forest(lambda u, v: lengths.get(u + v, lengths.get(v + u))))
+    print(g.minimum_spanning_forest(method='prim'))
+
+
+    print("\nabfs() / adfs() example")
+    print("-----------------------")
+    import asyncio
+    g = UndirectedGraph(['AE', 'AC', 'BE', 'CE', 'CD', 'CB', 'BD', 'ED', 'BH', 'QG', 'FG'])
+    print(asyncio.run(g.abfs('A', every=2)), asyncio.run(g.adfs('A', offload=True)))